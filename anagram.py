@@ -0,0 +1,216 @@
+"""
+Anagram solver for any letter rack in the Spelling Bee MadLibs game.
+
+The built in letterpots are fixed word lists. This module finds the words
+for any rack, including racks with repeated letters ("aabelst"), straight
+from the lexicon:
+
+    - every word with a part of speech is filed under its signature, its
+      letters sorted ("claim" -> "acilm"), in one dict;
+    - a rack's sub-multisets are walked in sorted letter order, so each one
+      is itself a signature, and a set of every signature prefix stops the
+      walk as soon as no word can start that way.
+
+A word may use each letter as many times as the rack has it. Results are
+grouped by part of speech, and register_rack() adds a rack as a letterpot so
+isvalid(), totalpoints() and missed_words() work on it like on a built in
+pot.
+
+Example:
+    solve("aceilms")["adjective"]   # ['mesial', 'mesic', 'same', 'slim', ...]
+    key = register_rack("aabelst")  # play it with GameSession("bob", key)
+
+Example Run Code:
+python3 anagram.py aceilms aabelst
+"""
+
+import sys
+import time
+from argparse import ArgumentParser
+
+import letterpotpoints
+
+MIN_LENGTH = 4
+
+
+class AnagramIndex:
+    """
+    Words with a part of speech, filed by sorted-letter signature.
+    Attributes:
+        pos_order (tuple): parts of speech, in result order.
+        signatures (dict): signature -> list of words with those letters.
+        word_pos (dict): word -> frozenset of its parts of speech.
+    """
+    def __init__(self, partofspeech_dict):
+        self.pos_order = tuple(partofspeech_dict)
+        self.signatures = {}
+        self.word_pos = {}
+        for pos in self.pos_order:
+            for word in partofspeech_dict[pos]:
+                if word not in self.word_pos:
+                    self.word_pos[word] = set()
+                    self.signatures.setdefault("".join(sorted(word)), []).append(word)
+                self.word_pos[word].add(pos)
+        self.word_pos = {word: frozenset(types)
+                         for word, types in self.word_pos.items()}
+        self._prefixes = set()
+        for signature in self.signatures:
+            for end in range(1, len(signature) + 1):
+                self._prefixes.add(signature[:end])
+
+    def words(self, rack, min_length=MIN_LENGTH):
+        """Find every word the rack can make.
+
+        Args:
+            rack (str): the letters, in any order, repeats allowed.
+            min_length (int): shortest word to return.
+
+        Returns:
+            list of str: the words, longest first then alphabetical.
+
+        Raises:
+            ValueError: if the rack has anything but letters.
+        """
+        rack = rack.lower()
+        if not rack.isalpha():
+            raise ValueError(f"a rack can only have letters, got {rack!r}")
+        letters = sorted(set(rack))
+        counts = [rack.count(letter) for letter in letters]
+        found = []
+        signatures = self.signatures
+        prefixes = self._prefixes
+
+        def walk(i, signature):
+            # signature is built in sorted order, so it is always a key
+            # candidate and its prefixes are the only ways to extend it
+            if len(signature) >= min_length and signature in signatures:
+                found.extend(signatures[signature])
+            for j in range(i, len(letters)):
+                extended = signature
+                for _ in range(counts[j]):
+                    extended += letters[j]
+                    if extended not in prefixes:
+                        break
+                    walk(j + 1, extended)
+
+        walk(0, "")
+        found.sort(key=lambda word: (-len(word), word))
+        return found
+
+    def solve(self, rack, min_length=MIN_LENGTH):
+        """Find every word the rack can make, grouped by part of speech.
+
+        Args:
+            rack (str): the letters, in any order, repeats allowed.
+            min_length (int): shortest word to return.
+
+        Returns:
+            dict: part of speech -> list of words (a word with two parts of
+            speech is in both), longest first then alphabetical.
+        """
+        grouped = {pos: [] for pos in self.pos_order}
+        for word in self.words(rack, min_length):
+            for pos in self.word_pos[word]:
+                grouped[pos].append(word)
+        return grouped
+
+
+_index = None
+
+
+def anagram_index():
+    """Return the index for the game's current part of speech dictionary,
+    building it the first time (and again after load_lexicon())."""
+    global _index
+    partofspeech = letterpotpoints.lexicon.partofspeech
+    if _index is None or _index[0] is not partofspeech:
+        _index = (partofspeech, AnagramIndex(partofspeech))
+    return _index[1]
+
+
+def solve(rack, min_length=MIN_LENGTH):
+    """Find a rack's words grouped by part of speech (see
+    AnagramIndex.solve())."""
+    return anagram_index().solve(rack, min_length)
+
+
+def rack_key(rack):
+    """Return the letterpot key for a rack: its letters, sorted."""
+    return "".join(sorted(rack.lower()))
+
+
+_pot_keys = None
+
+
+def existing_pot(rack):
+    """Return the key of the letterpot with the same letters as a rack, or
+    None. Built in keys are not sorted ("aerlswy"), so pots are matched by
+    rack_key(); the lookup is rebuilt when letterpots changes."""
+    global _pot_keys
+    letterpots = letterpotpoints.letterpots
+    if (_pot_keys is None or _pot_keys[0] is not letterpots
+            or _pot_keys[1] != len(letterpots)):
+        _pot_keys = (letterpots, len(letterpots),
+                     {rack_key(key): key for key in letterpots})
+    return _pot_keys[2].get(rack_key(rack))
+
+
+def register_rack(rack, min_length=MIN_LENGTH):
+    """Add a rack as a letterpot so the game can be played on it. A rack
+    with the same letters as a letterpot that already exists (e.g. a built
+    in one) is left as it is and that pot's key is returned.
+
+    Args:
+        rack (str): the letters, in any order, repeats allowed.
+        min_length (int): shortest word to include.
+
+    Returns:
+        str: the letterpot's key.
+
+    Raises:
+        ValueError: if the rack makes no words.
+    """
+    existing = existing_pot(rack)
+    if existing is not None:
+        return existing
+    key = rack_key(rack)
+    words = anagram_index().words(rack, min_length)
+    if not words:
+        raise ValueError(f"the rack {rack!r} makes no words")
+    letterpotpoints.add_letterpot(key, words)
+    return key
+
+
+def parse_args(arglist):
+    """ Parse command-line arguments.
+
+    Expect one or more mandatory arguments:
+        - racks: the letter racks to solve
+
+    Args:
+        arglist (list of str): arguments from the command line.
+
+    Returns:
+        namespace: the parsed arguments, as a namespace.
+    """
+    parser = ArgumentParser()
+    parser.add_argument("racks", nargs="+", help="Letter racks to solve")
+    parser.add_argument("--min-length", type=int, default=MIN_LENGTH,
+                        help="Shortest word to list")
+    parser.add_argument("--lexicon", help="Path to a lexicon file built "
+                        "with binlexicon.py")
+    return parser.parse_args(arglist)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    if args.lexicon:
+        letterpotpoints.load_lexicon(args.lexicon)
+    index = anagram_index()
+    for rack in args.racks:
+        began = time.perf_counter()
+        grouped = index.solve(rack, args.min_length)
+        elapsed = time.perf_counter() - began
+        print(f"{rack} ({elapsed * 1000:.2f} ms)")
+        for pos, words in grouped.items():
+            print(f"  {pos}: {', '.join(words)}")
@@ -0,0 +1,149 @@
+"""
+Bulk story generation for the Spelling Bee MadLibs game.
+
+Fills in large numbers of stories without anyone playing. Each story gets a
+random letterpot, a handful of that pot's words as the "player's" guesses,
+and filler words for the rest, exactly like auto_fill_story() does at the end
+of a game. The work is cut into shards that run on a process pool. Each shard
+has its own random.Random seeded from the run seed and the shard number, so
+the same seed always gives the same stories, and each shard writes its own
+JSON Lines file.
+
+Example Run Code:
+python3 batchstories.py samplestory.txt --count 1000000 --seed 7 -o out
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+
+import letterpotpoints
+
+
+def shard_seed(seed, shard):
+    """Return the seed for one shard so every shard gets its own stream."""
+    return f"{seed}-{shard}"
+
+
+def render_shard(shard, start, count, templates, seed, filler, guesses,
+                 out_dir):
+    """Fill in one shard of stories and write them to a JSONL file.
+
+    Args:
+        shard (int): shard number, used for the seed and the file name.
+        start (int): id of the first story in the shard.
+        count (int): number of stories in the shard.
+        templates (list of str): paths to story templates.
+        seed (int): seed for the whole run.
+        filler (dict): part of speech -> filler words.
+        guesses (int): how many pot words each fake player "guessed".
+        out_dir (str): directory for the JSONL files.
+
+    Returns:
+        tuple: (stories written, characters written).
+    """
+    rng = random.Random(shard_seed(seed, shard))
+    compiled = [letterpotpoints.compile_story(path) for path in templates]
+    pots = sorted(letterpotpoints.letterpots)
+    path = os.path.join(out_dir, f"stories-{shard:05d}.jsonl")
+    written = 0
+    with open(path, "w") as f:
+        for story_id in range(start, start + count):
+            which = rng.randrange(len(templates))
+            pot = rng.choice(pots)
+            words = letterpotpoints.letterpots[pot]
+            player = letterpotpoints.Player(f"batch{story_id}")
+            player.guessed_words = rng.sample(words, min(guesses, len(words)))
+            fill = letterpotpoints.SlotFiller(player, filler, rng)
+            line = json.dumps({"id": story_id, "template": templates[which],
+                               "pot": pot,
+                               "story": compiled[which].render(fill)})
+            f.write(line + "\n")
+            written += len(line) + 1
+    return count, written
+
+
+def generate(templates, count, seed=0, out_dir="stories", shard_size=10000,
+             workers=None, filler=None, guesses=10):
+    """Fill in count stories across a process pool.
+
+    Args:
+        templates (list of str): paths to story templates.
+        count (int): total number of stories.
+        seed (int): seed for the run; the same seed gives the same output.
+        out_dir (str): directory for the JSONL files (created if missing).
+        shard_size (int): stories per shard and per output file.
+        workers (int): processes to use, all cores if not given.
+        filler (dict): part of speech -> filler words, fillerpartofspeech if
+            not given.
+        guesses (int): how many pot words each fake player "guessed".
+
+    Returns:
+        tuple: (stories written, characters written, seconds taken).
+    """
+    if filler is None:
+        filler = letterpotpoints.fillerpartofspeech
+    os.makedirs(out_dir, exist_ok=True)
+    shards = []
+    for shard, start in enumerate(range(0, count, shard_size)):
+        shards.append((shard, start, min(shard_size, count - start)))
+    began = time.perf_counter()
+    stories = chars = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_shard, shard, start, size, templates,
+                               seed, filler, guesses, out_dir)
+                   for shard, start, size in shards]
+        for future in futures:
+            done, written = future.result()
+            stories += done
+            chars += written
+    return stories, chars, time.perf_counter() - began
+
+
+def parse_args(arglist):
+    """ Parse command-line arguments.
+
+    Expect one or more mandatory arguments:
+        - templates: paths to files containing fill-in-the-blank stories
+
+    Args:
+        arglist (list of str): arguments from the command line.
+
+    Returns:
+        namespace: the parsed arguments, as a namespace.
+    """
+    parser = ArgumentParser()
+    parser.add_argument("templates", nargs="+",
+                        help="Paths to the TXT files containing stories")
+    parser.add_argument("-n", "--count", type=int, default=1000,
+                        help="Number of stories to generate")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed for the run")
+    parser.add_argument("-o", "--out", default="stories",
+                        help="Directory for the JSONL output")
+    parser.add_argument("--shard-size", type=int, default=10000,
+                        help="Stories per output file")
+    parser.add_argument("--workers", type=int,
+                        help="Processes to use (default: all cores)")
+    parser.add_argument("--words", help="JSON file of part of speech -> "
+                        "filler words to use instead of the built in ones")
+    parser.add_argument("--guesses", type=int, default=10,
+                        help="Pot words each generated player has guessed")
+    return parser.parse_args(arglist)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    filler = None
+    if args.words:
+        with open(args.words) as f:
+            filler = json.load(f)
+    stories, chars, elapsed = generate(args.templates, args.count, args.seed,
+                                       args.out, args.shard_size, args.workers,
+                                       filler, args.guesses)
+    print(f"{stories} stories ({chars / 1e6:.1f} MB) in {elapsed:.2f}s: "
+          f"{stories / elapsed:.0f} stories/s", file=sys.stderr)
@@ -0,0 +1,254 @@
+"""
+Benchmarks for the scoring, validation and story hot paths of the Spelling
+Bee MadLibs game.
+
+Every benchmark runs against a synthetic letterpot, part of speech table and
+story of a given size, so the numbers do not depend on the small built in
+data. For each benchmark and size it records operations per second and the
+peak memory of one warm call (measured with tracemalloc, after a first call
+has filled the caches), prints a table and can save the results as a JSON
+baseline. A later run can be compared against a baseline, and anything
+slower or hungrier than the threshold is flagged as a regression (and the
+exit code is 1). Everything runs offline.
+
+Example Run Code:
+python3 benchmarks.py --save baseline.json
+python3 benchmarks.py --compare baseline.json --threshold 0.2
+python3 benchmarks.py --full
+"""
+
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+import letterpotpoints
+
+QUICK_WORDS = [10, 1000, 100000]
+FULL_WORDS = [10, 1000, 100000, 1000000]
+QUICK_STORY_KB = [1, 1024]
+FULL_STORY_KB = [1, 1024, 102400]
+POS_NAMES = ("noun", "plural noun", "verb", "adjective")
+BENCH_POT = "benchpot"
+
+
+def synthetic_words(count, rng):
+    """Make count distinct random lowercase words, 4 to 10 letters long."""
+    words = set()
+    while len(words) < count:
+        length = rng.randint(4, 10)
+        words.add("".join(rng.choice("abcdefghijklmnopqrstuvwxyz")
+                          for _ in range(length)))
+    return sorted(words)
+
+
+def synthetic_story(kilobytes, rng):
+    """Make a story about kilobytes KB long with a placeholder every few
+    words, numbered like the real ones (<noun1>, <plural noun2>, ...)."""
+    pieces = []
+    size = 0
+    counts = dict.fromkeys(POS_NAMES, 0)
+    while size < kilobytes * 1024:
+        pos = rng.choice(POS_NAMES)
+        counts[pos] += 1
+        piece = f"the quick brown fox saw a <{pos}{counts[pos] % 50 + 1}> today.\n"
+        pieces.append(piece)
+        size += len(piece)
+    return "".join(pieces)
+
+
+@contextlib.contextmanager
+def synthetic_lexicon(words, rng):
+    """Swap the game over to a synthetic pot and part of speech table, and
+    put the real ones back afterwards."""
+    saved = (letterpotpoints.letterpots, letterpotpoints.partofspeech_dict,
+             letterpotpoints.lexicon)
+    pos_dict = {pos: [] for pos in POS_NAMES}
+    for word in words:
+        #most words get one part of speech, a few get two and some none
+        for pos in rng.sample(POS_NAMES, rng.choice((0, 1, 1, 1, 2))):
+            pos_dict[pos].append(word)
+    pots = {BENCH_POT: words}
+    letterpotpoints.letterpots = pots
+    letterpotpoints.partofspeech_dict = pos_dict
+    letterpotpoints.lexicon = letterpotpoints.LexiconIndex(pots, pos_dict)
+    letterpotpoints.pot_cache.invalidate()
+    try:
+        yield pos_dict
+    finally:
+        (letterpotpoints.letterpots, letterpotpoints.partofspeech_dict,
+         letterpotpoints.lexicon) = saved
+        letterpotpoints.pot_cache.invalidate()
+
+
+def measure(func, min_time=0.2):
+    """Time func() until at least min_time seconds have gone by.
+
+    Returns:
+        dict: ops_per_sec, peak_bytes (peak memory of a single warm call)
+        and cold_peak_bytes (the first call, which also fills caches such
+        as pot_cache and the lexicon indexes).
+    """
+    peaks = []
+    for _ in range(2):
+        tracemalloc.start()
+        func()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    cold_peak, peak = peaks
+    calls = 0
+    began = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - began
+    return {"ops_per_sec": calls / elapsed, "peak_bytes": peak,
+            "cold_peak_bytes": cold_peak}
+
+
+def word_benchmarks(size, rng, min_time):
+    """Run the benchmarks that scale with the number of words in a pot."""
+    words = synthetic_words(size, rng)
+    results = {}
+    with synthetic_lexicon(words, rng) as pos_dict:
+        player = letterpotpoints.Player("bench")
+        player.guessed_words = rng.sample(words, min(len(words), 50))
+        guess = player.guessed_words[0]
+        wordtype = letterpotpoints.get_word_type(guess, pos_dict) or "noun"
+        devnull = open(os.devnull, "w")
+
+        def missed():
+            with contextlib.redirect_stdout(devnull):
+                letterpotpoints.missed_words(BENCH_POT, player)
+
+        benchmarks = {
+            "totalpoints": lambda: letterpotpoints.totalpoints(BENCH_POT),
+            "inputpoints": lambda: letterpotpoints.inputpoints(guess, BENCH_POT, wordtype),
+            "isvalid": lambda: _isvalid(guess, wordtype),
+            "get_word_type": lambda: letterpotpoints.get_word_type(guess, pos_dict),
+            "pos_guess": lambda: player.pos_guess(pos_dict),
+            "missed_words": missed,
+        }
+        for name, func in benchmarks.items():
+            results[f"{name}@{size}"] = measure(func, min_time)
+        devnull.close()
+    return results
+
+
+def _isvalid(guess, wordtype):
+    try:
+        letterpotpoints.isvalid(BENCH_POT, guess, wordtype)
+    except ValueError:
+        pass
+
+
+def story_benchmarks(kilobytes, rng, min_time):
+    """Run the benchmarks that scale with the size of the story."""
+    text = synthetic_story(kilobytes, rng)
+    player = letterpotpoints.Player("bench")
+    player.guessed_words = ["calm", "hype", "relay", "seal", "smile"]
+    filler = letterpotpoints.fillerpartofspeech
+    results = {}
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write(text)
+    try:
+        benchmarks = {
+            "extract_placeholders": lambda: letterpotpoints.extract_placeholders(text),
+            "auto_fill_story": lambda: letterpotpoints.auto_fill_story(f.name, player, filler),
+        }
+        for name, func in benchmarks.items():
+            results[f"{name}@{kilobytes}KB"] = measure(func, min_time)
+    finally:
+        os.unlink(f.name)
+    return results
+
+
+def run(word_sizes, story_sizes, seed=0, min_time=0.2):
+    """Run every benchmark at every size.
+
+    Returns:
+        dict: benchmark name@size -> {"ops_per_sec", "peak_bytes",
+        "cold_peak_bytes"}.
+    """
+    rng = random.Random(seed)
+    results = {}
+    for size in word_sizes:
+        results.update(word_benchmarks(size, rng, min_time))
+    for kilobytes in story_sizes:
+        results.update(story_benchmarks(kilobytes, rng, min_time))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Find benchmarks that got slower or used more memory than baseline.
+
+    Args:
+        results (dict): output of run().
+        baseline (dict): an earlier output of run().
+        threshold (float): allowed change, e.g. 0.2 for 20%.
+
+    Returns:
+        list of str: one line per regression.
+    """
+    regressions = []
+    for name, now in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if now["ops_per_sec"] < before["ops_per_sec"] * (1 - threshold):
+            regressions.append(f"{name}: {before['ops_per_sec']:.0f} -> "
+                               f"{now['ops_per_sec']:.0f} ops/s")
+        if now["peak_bytes"] > before["peak_bytes"] * (1 + threshold):
+            regressions.append(f"{name}: {before['peak_bytes']} -> "
+                               f"{now['peak_bytes']} peak bytes")
+    return regressions
+
+
+def parse_args(arglist):
+    """ Parse command-line arguments.
+
+    Args:
+        arglist (list of str): arguments from the command line.
+
+    Returns:
+        namespace: the parsed arguments, as a namespace.
+    """
+    parser = ArgumentParser()
+    parser.add_argument("--full", action="store_true",
+                        help="Also run 1M word lexicons and 100 MB stories")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare against this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown/memory growth before a "
+                        "benchmark counts as a regression (0.2 = 20%%)")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="Seconds to spend on each benchmark")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed for the synthetic data")
+    return parser.parse_args(arglist)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    results = run(FULL_WORDS if args.full else QUICK_WORDS,
+                  FULL_STORY_KB if args.full else QUICK_STORY_KB,
+                  args.seed, args.min_time)
+    for name, result in results.items():
+        print(f"{name:32} {result['ops_per_sec']:>14,.0f} ops/s "
+              f"{result['peak_bytes']:>14,} peak bytes")
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
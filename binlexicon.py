@@ -0,0 +1,378 @@
+"""
+Compact binary lexicon for the Spelling Bee MadLibs game.
+
+Compiles letterpots and partofspeech_dict (or much bigger lexicons loaded
+from JSON) into one file that the game opens with mmap. Nothing is decoded
+until it is asked for, so startup time and memory stay the same no matter
+how many words the file holds.
+
+File layout (little-endian, every section starts on a 4 byte boundary):
+
+    header      magic (ending in the format version), counts and the
+                offset of every section
+    pos names   part of speech names, one byte length + UTF-8 each
+    word index  word_count + 1 uint32 offsets into the word strings
+    words       UTF-8 words, sorted, back to back
+    word pos    one byte per word, bit i set = word is pos name i
+    key index   pot_count + 1 uint32 offsets into the key strings
+    keys        UTF-8 letterpot keys, sorted, back to back
+    pot index   pot_count + 1 uint32 offsets into the pot word ids
+    pot ids     uint32 word ids of every pot's words, sorted within a pot
+
+Example Run Code:
+python3 binlexicon.py lexicon.bin
+python3 letterpotpoints.py samplestory.txt --lexicon lexicon.bin
+"""
+
+import bisect
+import copy
+import json
+import mmap
+import struct
+import sys
+from argparse import ArgumentParser
+from collections.abc import Mapping
+
+MAGIC = b"MLBLEX\x00\x01"
+HEADER = struct.Struct("<8sIIII8Q")
+MAX_POS = 8
+
+
+def _pad(data):
+    """Pad a bytearray out to a 4 byte boundary."""
+    data.extend(b"\x00" * (-len(data) % 4))
+
+
+def _strings(strings):
+    """Pack strings as (uint32 offsets, UTF-8 blob)."""
+    offsets = [0]
+    blob = bytearray()
+    for string in strings:
+        blob.extend(string.encode("utf-8"))
+        offsets.append(len(blob))
+    return struct.pack(f"<{len(offsets)}I", *offsets), bytes(blob)
+
+
+def pack_lexicon(letterpots, partofspeech_dict):
+    """Compile a lexicon into the binary format.
+
+    Args:
+        letterpots (dict): letterpot key -> list of words.
+        partofspeech_dict (dict): part of speech -> list of words.
+
+    Returns:
+        bytes: the whole file.
+
+    Raises:
+        ValueError: if there are more than 8 parts of speech.
+    """
+    pos_names = list(partofspeech_dict)
+    if len(pos_names) > MAX_POS:
+        raise ValueError(f"at most {MAX_POS} parts of speech are supported")
+    words = set()
+    for key in letterpots:
+        words.update(letterpots[key])
+    for pos in pos_names:
+        words.update(partofspeech_dict[pos])
+    words = sorted(words)
+    word_id = {word: i for i, word in enumerate(words)}
+
+    pos_bits = bytearray(len(words))
+    for bit, pos in enumerate(pos_names):
+        for word in partofspeech_dict[pos]:
+            pos_bits[word_id[word]] |= 1 << bit
+
+    keys = sorted(letterpots)
+    pot_index = [0]
+    pot_ids = []
+    for key in keys:
+        pot_ids.extend(sorted({word_id[word] for word in letterpots[key]}))
+        pot_index.append(len(pot_ids))
+
+    sections = []
+    names = bytearray()
+    for pos in pos_names:
+        encoded = pos.encode("utf-8")
+        names.append(len(encoded))
+        names.extend(encoded)
+    sections.append(bytes(names))
+    sections.extend(_strings(words))
+    sections.append(bytes(pos_bits))
+    sections.extend(_strings(keys))
+    sections.append(struct.pack(f"<{len(pot_index)}I", *pot_index))
+    sections.append(struct.pack(f"<{len(pot_ids)}I", *pot_ids))
+
+    body = bytearray()
+    offsets = []
+    for section in sections:
+        offsets.append(HEADER.size + len(body))
+        body.extend(section)
+        _pad(body)
+    header = HEADER.pack(MAGIC, len(pos_names), len(words), len(keys),
+                         len(pot_ids), *offsets)
+    return header + bytes(body)
+
+
+def build_lexicon(path, letterpots, partofspeech_dict):
+    """Compile a lexicon and write it to path."""
+    with open(path, "wb") as f:
+        f.write(pack_lexicon(letterpots, partofspeech_dict))
+
+
+class _PotWords:
+    """The words of one letterpot, read straight from the file."""
+    def __init__(self, lexicon, lo, hi):
+        self._lexicon = lexicon
+        self._lo = lo
+        self._hi = hi
+
+    def __contains__(self, word):
+        word_id = self._lexicon.find(word)
+        if word_id < 0:
+            return False
+        ids = self._lexicon._pot_ids
+        i = bisect.bisect_left(ids, word_id, self._lo, self._hi)
+        return i < self._hi and ids[i] == word_id
+
+    def __iter__(self):
+        word = self._lexicon.word
+        for i in range(self._lo, self._hi):
+            yield word(self._lexicon._pot_ids[i])
+
+    def __len__(self):
+        return self._hi - self._lo
+
+
+class _PotMapping(Mapping):
+    """letterpot key -> words, decoded when asked for."""
+    def __init__(self, lexicon, as_list):
+        self._lexicon = lexicon
+        self._as_list = as_list
+
+    def __getitem__(self, key):
+        extra = self._lexicon._extra.get(key)
+        if extra is not None:
+            return list(extra[0]) if self._as_list else extra[1]
+        words = self._lexicon.pot(key)
+        return list(words) if self._as_list else words
+
+    def __iter__(self):
+        return self._lexicon.keys()
+
+    def __len__(self):
+        return self._lexicon.pot_count + len(self._lexicon._extra_keys)
+
+
+class _PosMapping(Mapping):
+    """part of speech -> words. Getting a list scans every word, so the game
+    only uses this for identity checks and pos_order."""
+    def __init__(self, lexicon):
+        self._lexicon = lexicon
+
+    def __getitem__(self, pos):
+        bit = 1 << self._lexicon.pos_order.index(pos)
+        bits = self._lexicon._pos_bits
+        return [self._lexicon.word(i) for i in range(len(bits)) if bits[i] & bit]
+
+    def __iter__(self):
+        return iter(self._lexicon.pos_order)
+
+    def __len__(self):
+        return len(self._lexicon.pos_order)
+
+
+class BinaryLexicon:
+    """
+    A lexicon file opened with mmap. It answers the same questions as
+    LexiconIndex in letterpotpoints.py, decoding only what it needs.
+    Attributes:
+        pos_order (tuple): parts of speech in the order they were built.
+        word_count (int): number of distinct words.
+        pot_count (int): number of letterpots in the file (pots added with
+            with_pot() are on top of these).
+        pot_words (mapping): letterpot key -> its words (supports "in").
+        letterpots (mapping): letterpot key -> list of its words.
+        partofspeech (mapping): part of speech -> list of its words.
+    """
+    def __init__(self, buffer):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        (magic, pos_count, self.word_count, self.pot_count, id_count,
+         names, word_index, words, word_pos, key_index, keys,
+         pot_index, pot_ids) = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("not a MadLibsBee lexicon file")
+        if sys.byteorder != "little":
+            raise ValueError("binary lexicons need a little-endian machine")
+
+        pos_order = []
+        at = names
+        for _ in range(pos_count):
+            size = view[at]
+            pos_order.append(bytes(view[at + 1:at + 1 + size]).decode("utf-8"))
+            at += 1 + size
+        self.pos_order = tuple(pos_order)
+        self._pos_sets = {}
+
+        self._word_index = view[word_index:word_index + 4 * (self.word_count + 1)].cast("I")
+        self._words = view[words:word_pos]
+        self._pos_bits = view[word_pos:word_pos + self.word_count]
+        self._key_index = view[key_index:key_index + 4 * (self.pot_count + 1)].cast("I")
+        self._keys = view[keys:pot_index]
+        self._pot_index = view[pot_index:pot_index + 4 * (self.pot_count + 1)].cast("I")
+        self._pot_ids = view[pot_ids:pot_ids + 4 * id_count].cast("I")
+
+        # pots added after opening: key -> (words, frozenset of words), and
+        # the added keys the file does not have, in the order they came
+        self._extra = {}
+        self._extra_keys = []
+        self.pot_words = _PotMapping(self, as_list=False)
+        self.letterpots = _PotMapping(self, as_list=True)
+        self.partofspeech = _PosMapping(self)
+
+    @classmethod
+    def open(cls, path):
+        """Open a lexicon file with mmap."""
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def word(self, word_id):
+        """Return the word with this id."""
+        return bytes(self._words[self._word_index[word_id]:
+                                 self._word_index[word_id + 1]]).decode("utf-8")
+
+    def _search(self, target, index, blob, count):
+        """Binary search a sorted string table for target (bytes)."""
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bytes(blob[index[mid]:index[mid + 1]]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < count and bytes(blob[index[lo]:index[lo + 1]]) == target:
+            return lo
+        return -1
+
+    def find(self, word):
+        """Return the id of a word, or -1 if it is not in the lexicon."""
+        return self._search(word.encode("utf-8"), self._word_index,
+                            self._words, self.word_count)
+
+    def key(self, i):
+        """Return the i-th letterpot key: the file's keys in sorted order,
+        then the added ones."""
+        if i >= self.pot_count:
+            return self._extra_keys[i - self.pot_count]
+        return bytes(self._keys[self._key_index[i]:
+                                self._key_index[i + 1]]).decode("utf-8")
+
+    def keys(self):
+        """Iterate over the letterpot keys, in sorted order, then the added
+        ones."""
+        for i in range(self.pot_count + len(self._extra_keys)):
+            yield self.key(i)
+
+    def pot(self, letterpot_key):
+        """Return the words of a letterpot. Raises KeyError if there is no
+        such pot, like indexing letterpots does."""
+        extra = self._extra.get(letterpot_key)
+        if extra is not None:
+            return extra[1]
+        i = self._search(letterpot_key.encode("utf-8"), self._key_index,
+                         self._keys, self.pot_count)
+        if i < 0:
+            raise KeyError(letterpot_key)
+        return _PotWords(self, self._pot_index[i], self._pot_index[i + 1])
+
+    def _bits(self, word):
+        word_id = self.find(word)
+        return self._pos_bits[word_id] if word_id >= 0 else 0
+
+    def pos_of(self, word):
+        """Return every part of speech of a word (empty if it has none)."""
+        bits = self._bits(word)
+        found = self._pos_sets.get(bits)
+        if found is None:
+            found = frozenset(pos for bit, pos in enumerate(self.pos_order)
+                              if bits >> bit & 1)
+            self._pos_sets[bits] = found
+        return found
+
+    def word_type(self, word):
+        """Return the first part of speech of a word, in pos_order, or None."""
+        bits = self._bits(word)
+        if not bits:
+            return None
+        return self.pos_order[(bits & -bits).bit_length() - 1]
+
+    def has_pos(self, word, pos):
+        """Check whether a word can be used as a part of speech."""
+        if pos not in self.pos_order:
+            return False
+        return bool(self._bits(word) >> self.pos_order.index(pos) & 1)
+
+    def in_pot(self, letterpot_key, word):
+        """Check whether a word is in a letterpot."""
+        return word in self.pot(letterpot_key)
+
+    def with_pot(self, letterpot_key, words):
+        """Return a copy of the lexicon with one letterpot added or replaced.
+        The file is read only, so the pot is kept in memory on top of it;
+        the mapped file and the part of speech mapping are shared, not
+        copied.
+
+        Args:
+            letterpot_key (str): key of the pot.
+            words (list of str): the pot's words.
+
+        Returns:
+            BinaryLexicon: the new lexicon.
+        """
+        index = copy.copy(self)
+        index._extra = dict(self._extra)
+        index._extra[letterpot_key] = (list(words), frozenset(words))
+        index._extra_keys = list(self._extra_keys)
+        if (letterpot_key not in self._extra_keys
+                and self._search(letterpot_key.encode("utf-8"), self._key_index,
+                                 self._keys, self.pot_count) < 0):
+            index._extra_keys.append(letterpot_key)
+        index.pot_words = _PotMapping(index, as_list=False)
+        index.letterpots = _PotMapping(index, as_list=True)
+        return index
+
+    def __len__(self):
+        return self.word_count
+
+
+def parse_args(arglist):
+    """ Parse command-line arguments.
+
+    Expect one mandatory argument:
+        - output: where to write the lexicon file
+
+    Args:
+        arglist (list of str): arguments from the command line.
+
+    Returns:
+        namespace: the parsed arguments, as a namespace.
+    """
+    parser = ArgumentParser()
+    parser.add_argument("output", help="Path to write the lexicon file to")
+    parser.add_argument("--source", help="JSON file with \"letterpots\" and "
+                        "\"partofspeech\" objects (default: the built in "
+                        "game data)")
+    return parser.parse_args(arglist)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    if args.source:
+        with open(args.source) as f:
+            source = json.load(f)
+        pots, pos = source["letterpots"], source["partofspeech"]
+    else:
+        import letterpotpoints
+        pots, pos = letterpotpoints.letterpots, letterpotpoints.partofspeech_dict
+    build_lexicon(args.output, pots, pos)
+    print(f"Wrote {args.output}", file=sys.stderr)
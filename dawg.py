@@ -0,0 +1,250 @@
+"""
+Prefix checking for as-you-type feedback in the Spelling Bee MadLibs game.
+
+Compiles a letterpot's words into a minimized DAWG (a trie where identical
+endings are shared). Every node knows which parts of speech can still be
+reached below it, so in O(length of input) it can answer:
+
+    - is this partial input still the start of any word in the pot?
+    - which parts of speech could it still turn into?
+    - is it a complete word, and which parts of speech is it?
+
+Clients can reject a dead-end keystroke right away instead of waiting for
+the whole word. The same structure answers full-word validation.
+
+Once built, the DAWG is packed into flat arrays (see Dawg), so it takes
+less memory than the pot's list of word strings.
+
+Example:
+    dawg = pot_dawg("aceilms")
+    dawg.prefix_pos("cla")     # frozenset({'noun', 'verb', 'plural noun'})
+    dawg.is_valid("claim")     # True
+"""
+
+import sys
+from array import array
+from collections import OrderedDict
+
+import letterpotpoints
+
+
+class Dawg:
+    """
+    A minimized DAWG over a set of words, each with a part of speech bitmask.
+    It is built with a dict of edges per node, then packed into flat arrays
+    with node 0 as the root:
+
+        first     node -> index of its first edge (node + 1 -> one past its
+                  last), so a node's edges are first[node]:first[node + 1]
+        labels    one string holding every edge letter, sorted within a node
+        children  edge -> child node
+        final     node -> pos bitmask if a word ends there, else -1
+        reach     node -> pos bits of every word at or below it (one byte)
+
+    Attributes:
+        pos_order (tuple): part of speech names, bit i = pos_order[i].
+        node_count (int): number of nodes after minimization.
+    """
+    def __init__(self, words, pos_order):
+        """Build the DAWG.
+
+        Args:
+            words (dict): word -> part of speech bitmask (0 for a word in the
+                pot that has no part of speech).
+            pos_order (tuple): part of speech names for the bitmask bits.
+        """
+        self.pos_order = tuple(pos_order)
+        if len(self.pos_order) > 8:
+            raise ValueError("at most 8 parts of speech are supported")
+        self._edges = [{}]      # node -> {letter: child node}
+        self._final = [-1]      # node -> pos bitmask if a word ends here, else -1
+        self._reach = [0]       # node -> pos bits of every word at or below
+        self._register = {}
+        self._unchecked = []    # (parent, letter, child) not yet minimized
+        previous = ""
+        for word in sorted(words):
+            self._insert(word, words[word], previous)
+            previous = word
+        self._minimize(0)
+        self._register = None
+        self._unchecked = None
+        self._compact()
+        self._pos_sets = {}
+        self.node_count = len(self._final)
+
+    def _insert(self, word, bits, previous):
+        # Daciuk et al.: words arrive sorted, so everything after the common
+        # prefix with the previous word will never change again
+        common = 0
+        while (common < len(word) and common < len(previous)
+               and word[common] == previous[common]):
+            common += 1
+        self._minimize(common)
+        node = self._unchecked[-1][2] if self._unchecked else 0
+        for letter in word[common:]:
+            child = len(self._edges)
+            self._edges.append({})
+            self._final.append(-1)
+            self._reach.append(0)
+            self._edges[node][letter] = child
+            self._unchecked.append((node, letter, child))
+            node = child
+        self._final[node] = bits
+
+    def _minimize(self, down_to):
+        while len(self._unchecked) > down_to:
+            parent, letter, child = self._unchecked.pop()
+            reach = max(self._final[child], 0)
+            for grandchild in self._edges[child].values():
+                reach |= self._reach[grandchild]
+            self._reach[child] = reach
+            signature = (self._final[child],
+                         tuple(sorted(self._edges[child].items())))
+            existing = self._register.get(signature)
+            if existing is None:
+                self._register[signature] = child
+            else:
+                self._edges[parent][letter] = existing
+        if down_to == 0:
+            reach = max(self._final[0], 0)
+            for child in self._edges[0].values():
+                reach |= self._reach[child]
+            self._reach[0] = reach
+
+    def _compact(self):
+        """Drop the nodes minimization replaced, renumber the rest and pack
+        them into the flat arrays."""
+        number = {0: 0}
+        order = [0]
+        for node in order:
+            for child in self._edges[node].values():
+                if child not in number:
+                    number[child] = len(order)
+                    order.append(child)
+        edge_count = sum(len(self._edges[node]) for node in order)
+        # 16-bit numbers whenever they are big enough
+        typecode = "H" if max(len(order), edge_count) < 1 << 16 else "I"
+        first = array(typecode, [0])
+        labels = []
+        children = array(typecode)
+        for node in order:
+            for letter, child in sorted(self._edges[node].items()):
+                labels.append(letter)
+                children.append(number[child])
+            first.append(len(children))
+        self._first = first
+        self._labels = "".join(labels)
+        self._children = children
+        self._final = array("h", [self._final[node] for node in order])
+        self._reach = bytes(self._reach[node] for node in order)
+        self._edges = None
+
+    def nbytes(self):
+        """Return the memory the packed arrays take, in bytes."""
+        return sum(sys.getsizeof(part) for part in
+                   (self._first, self._labels, self._children, self._final,
+                    self._reach))
+
+    def _walk(self, text):
+        first = self._first
+        labels = self._labels
+        children = self._children
+        node = 0
+        for letter in text:
+            edge = labels.find(letter, first[node], first[node + 1])
+            if edge < 0:
+                return None
+            node = children[edge]
+        return node
+
+    def _pos_set(self, bits):
+        found = self._pos_sets.get(bits)
+        if found is None:
+            found = frozenset(pos for bit, pos in enumerate(self.pos_order)
+                              if bits >> bit & 1)
+            self._pos_sets[bits] = found
+        return found
+
+    def is_prefix(self, text):
+        """Check whether text is the start of (or all of) any word."""
+        return self._walk(text) is not None
+
+    def prefix_pos(self, text):
+        """Return the parts of speech text could still turn into (empty if
+        it is a dead end)."""
+        node = self._walk(text)
+        return self._pos_set(self._reach[node]) if node is not None else frozenset()
+
+    def is_word(self, text):
+        """Check whether text is a complete word in the DAWG."""
+        node = self._walk(text)
+        return node is not None and self._final[node] >= 0
+
+    def word_pos(self, text):
+        """Return the parts of speech of a complete word (empty if it is not
+        one)."""
+        node = self._walk(text)
+        if node is None or self._final[node] < 0:
+            return frozenset()
+        return self._pos_set(self._final[node])
+
+    def is_valid(self, text, wordtype=None):
+        """Full-word check that matches isvalid(): at least 4 letters, in the
+        pot, and (if given) usable as wordtype. With no wordtype any part of
+        speech will do."""
+        if len(text) < 4:
+            return False
+        types = self.word_pos(text)
+        return wordtype in types if wordtype is not None else bool(types)
+
+    def check(self, text):
+        """Everything a client needs after a keystroke.
+
+        Returns:
+            dict: "alive" (still a prefix of some word), "prefix_pos" (parts
+            of speech still reachable), "word" (complete valid word) and
+            "pos" (its parts of speech).
+        """
+        node = self._walk(text)
+        if node is None:
+            return {"alive": False, "prefix_pos": frozenset(), "word": False,
+                    "pos": frozenset()}
+        final = self._final[node]
+        pos = self._pos_set(final) if final > 0 else frozenset()
+        return {"alive": True, "prefix_pos": self._pos_set(self._reach[node]),
+                "word": bool(pos) and len(text) >= 4, "pos": pos}
+
+
+# most DAWGs kept at once; like pot_cache, the least recently used pot is
+# dropped first, so a server that sees lots of pots does not keep them all
+DAWG_CACHE_SIZE = 1024
+_dawgs = OrderedDict()
+
+
+def pot_dawg(letterpot_key):
+    """Return the DAWG for a letterpot, building it the first time (or
+    after it has been dropped from the cache).
+
+    Args:
+        letterpot_key (str): key of the letterpot.
+
+    Returns:
+        Dawg: the pot's words with their parts of speech.
+    """
+    lexicon = letterpotpoints.lexicon
+    cached = _dawgs.get(letterpot_key)
+    if cached is not None and cached[0] is lexicon:
+        _dawgs.move_to_end(letterpot_key)
+        return cached[1]
+    pos_order = lexicon.pos_order
+    words = {}
+    for word in letterpotpoints.letterpots[letterpot_key]:
+        types = lexicon.pos_of(word)
+        words[word] = sum(1 << bit for bit, pos in enumerate(pos_order)
+                          if pos in types)
+    dawg = Dawg(words, pos_order)
+    _dawgs[letterpot_key] = (lexicon, dawg)
+    _dawgs.move_to_end(letterpot_key)
+    if len(_dawgs) > DAWG_CACHE_SIZE:
+        _dawgs.popitem(last=False)
+    return dawg
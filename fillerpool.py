@@ -0,0 +1,233 @@
+"""
+Filler word pools for the Spelling Bee MadLibs game.
+
+When the player has not guessed enough words for a story, the blanks are
+filled from filler words. A FillerPool holds the filler words for one part
+of speech (optionally with frequency weights) and hands out a sampler per
+story. Each draw is O(1) and never repeats a word within the story:
+
+    - without weights, the sampler runs a Fisher-Yates shuffle one step at a
+      time, keeping only the swapped positions in a dict, so the word list
+      is never copied however big it is;
+    - with weights, words are drawn from a Walker/Vose alias table built
+      once when the pool is made, and words already used in the story are
+      drawn again (rejection sampling).
+
+Pools are loaded from word files, so a part of speech can have hundreds of
+thousands of filler words:
+
+    filler/noun.txt          one word per line, optionally followed by
+    filler/plural_noun.txt   whitespace and a weight (underscores in the
+    ...                      file name become spaces in the pos name)
+
+or one tab separated file with "pos<TAB>word[<TAB>weight]" lines.
+
+Example Run Code:
+python3 letterpotpoints.py samplestory.txt --filler filler/
+"""
+
+import os
+import random
+
+# rejected weighted draws before the sampler falls back to one linear pick
+MAX_REJECTIONS = 32
+
+
+class FillerPool:
+    """
+    The filler words for one part of speech.
+    Attributes:
+        words (list of str): the words. Not copied, so a pool over a list
+            costs nothing to make.
+        weights (list of float): each word's weight, or None if every word is
+            as likely as any other. A word with weight 0 is never drawn.
+        drawable (int): number of words that can be drawn.
+    """
+    def __init__(self, words, weights=None):
+        self.words = words
+        self.weights = weights
+        self.drawable = len(words)
+        self._prob = None
+        self._alias = None
+        if weights is not None:
+            if len(weights) != len(words):
+                raise ValueError("need one weight per word")
+            if any(weight < 0 for weight in weights):
+                raise ValueError("weights cannot be negative")
+            self.drawable = sum(1 for weight in weights if weight > 0)
+            if self.drawable:
+                self._build_alias(weights)
+
+    def _build_alias(self, weights):
+        # Vose's alias method: every column holds at most two words, so a
+        # draw is one random column plus one coin flip
+        count = len(weights)
+        total = float(sum(weights))
+        scaled = [weight * count / total for weight in weights]
+        prob = [1.0] * count
+        alias = list(range(count))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        self._prob = prob
+        self._alias = alias
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __contains__(self, word):
+        return word in self.words
+
+    def sampler(self, rng=random):
+        """Start drawing words for one story.
+
+        Args:
+            rng: random number generator to use.
+
+        Returns:
+            PoolSampler: draws words from this pool without repeats.
+        """
+        return PoolSampler(self, rng)
+
+
+class PoolSampler:
+    """
+    Draws words from a FillerPool without replacement.
+    Attributes:
+        pool (FillerPool): the pool drawn from.
+        drawn (int): words drawn since the last reset.
+    """
+    def __init__(self, pool, rng=random):
+        self.pool = pool
+        self.rng = rng
+        self.reset()
+
+    def reset(self):
+        """Put every word back, so words can be used again."""
+        self.drawn = 0
+        self._swapped = {}
+        self._used = set()
+
+    def exhausted(self):
+        """Check whether every word that can be drawn has been."""
+        return self.drawn >= self.pool.drawable
+
+    def draw(self, skip=()):
+        """Take the next word.
+
+        Args:
+            skip (set): words not to return (they are used up as well).
+
+        Returns:
+            str: the word, or None if every word has been drawn.
+        """
+        while not self.exhausted():
+            if self.pool.weights is None:
+                word = self._draw_shuffled()
+            else:
+                word = self._draw_weighted()
+            if word not in skip:
+                return word
+        return None
+
+    def _draw_shuffled(self):
+        # one step of Fisher-Yates over the words not drawn yet, which are
+        # positions 0 .. last; the dict stands in for the swaps
+        words = self.pool.words
+        last = len(words) - 1 - self.drawn
+        i = self.rng.randint(0, last)
+        picked = self._swapped.get(i, i)
+        self._swapped[i] = self._swapped.pop(last, last)
+        self.drawn += 1
+        return words[picked]
+
+    def _draw_weighted(self):
+        pool = self.pool
+        count = len(pool.words)
+        for _ in range(MAX_REJECTIONS):
+            column = self.rng.randrange(count)
+            i = column if self.rng.random() < pool._prob[column] else pool._alias[column]
+            # rounding can leave a weight 0 word a full column, so check
+            if i not in self._used and pool.weights[i] > 0:
+                break
+        else:
+            # nearly everything has been used, so pick from what is left;
+            # exhausted() counts only words with weight, so some are left
+            left = [i for i in range(count)
+                    if i not in self._used and pool.weights[i] > 0]
+            i = self.rng.choices(left, [pool.weights[j] for j in left])[0]
+        self._used.add(i)
+        self.drawn += 1
+        return pool.words[i]
+
+
+def as_pool(words):
+    """Return words as a FillerPool (a list is wrapped without copying)."""
+    if isinstance(words, FillerPool):
+        return words
+    return FillerPool(words if isinstance(words, list) else list(words))
+
+
+def _read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def _make_pools(entries):
+    """Build pools from pos -> list of (word, weight or None)."""
+    pools = {}
+    for pos, pairs in entries.items():
+        seen = {}
+        for word, weight in pairs:
+            seen.setdefault(word, weight)
+        words = list(seen)
+        weights = None
+        if any(weight is not None for weight in seen.values()):
+            weights = [1.0 if weight is None else weight
+                       for weight in seen.values()]
+        pools[pos] = FillerPool(words, weights)
+    return pools
+
+
+def load_filler(path):
+    """Load filler pools from a directory of per-pos word files or from one
+    tab separated file (see the module docstring for the formats).
+
+    Args:
+        path (str): the directory or file.
+
+    Returns:
+        dict: part of speech -> FillerPool.
+    """
+    entries = {}
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            stem, extension = os.path.splitext(name)
+            if extension != ".txt":
+                continue
+            pairs = entries.setdefault(stem.replace("_", " "), [])
+            for line in _read_lines(os.path.join(path, name)):
+                fields = line.split()
+                pairs.append((fields[0].lower(),
+                              float(fields[1]) if len(fields) > 1 else None))
+    else:
+        for line in _read_lines(path):
+            fields = line.split("\t")
+            if len(fields) < 2:
+                raise ValueError(f"expected pos<TAB>word, got {line!r}")
+            weight = float(fields[2]) if len(fields) > 2 else None
+            entries.setdefault(fields[0].strip(), []).append(
+                (fields[1].strip().lower(), weight))
+    return _make_pools(entries)
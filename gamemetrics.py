@@ -0,0 +1,165 @@
+"""
+Counters and latency histograms for the Spelling Bee MadLibs game.
+
+letterpotpoints.py records guess latency, valid/invalid/duplicate guess
+counts, hint time and story render time into the registry below. Recording
+is off by default and every hot path checks registry.enabled before reading
+the clock, so a game that does not ask for metrics pays one attribute lookup
+per guess. The registry can be written out as Prometheus text or JSON.
+
+Example:
+    import gamemetrics
+    gamemetrics.registry.enabled = True
+    ... play some games ...
+    gamemetrics.registry.dump("metrics.prom")
+"""
+
+import bisect
+import json
+
+# upper bounds in seconds, 10 microseconds to 1 second
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0)
+
+
+class Counter:
+    """
+    A number that only goes up.
+    Attributes:
+        name (str): metric name.
+        help (str): one line description.
+        value (int): current count.
+    """
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def reset(self):
+        self.value = 0
+
+
+class Histogram:
+    """
+    Counts observations into buckets by upper bound.
+    Attributes:
+        name (str): metric name.
+        help (str): one line description.
+        buckets (tuple): bucket upper bounds, smallest first.
+        counts (list): observations per bucket, plus one for +Inf.
+        sum (float): total of every observation.
+        count (int): number of observations.
+    """
+    def __init__(self, name, buckets=DEFAULT_BUCKETS, help=""):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.reset()
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile (0-1) as the upper bound of its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def reset(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """
+    Holds every counter and histogram by name.
+    Attributes:
+        enabled (bool): whether the game should record anything.
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._metrics = {}
+
+    def counter(self, name, help=""):
+        """Return the counter with this name, creating it if needed."""
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = Counter(name, help)
+        return metric
+
+    def histogram(self, name, buckets=DEFAULT_BUCKETS, help=""):
+        """Return the histogram with this name, creating it if needed."""
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = Histogram(name, buckets, help)
+        return metric
+
+    def reset(self):
+        """Zero every metric, keeping the objects so callers can hold on to
+        them."""
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def to_prometheus(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            if isinstance(metric, Counter):
+                lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name} {metric.value}")
+                continue
+            lines.append(f"# TYPE {name} histogram")
+            seen = 0
+            for bound, count in zip(metric.buckets, metric.counts):
+                seen += count
+                lines.append(f'{name}_bucket{{le="{bound}"}} {seen}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {metric.count}')
+            lines.append(f"{name}_sum {metric.sum}")
+            lines.append(f"{name}_count {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self):
+        """Return every metric as a JSON string."""
+        data = {}
+        for name, metric in sorted(self._metrics.items()):
+            if isinstance(metric, Counter):
+                data[name] = {"type": "counter", "value": metric.value}
+            else:
+                data[name] = {"type": "histogram", "count": metric.count,
+                              "sum": metric.sum,
+                              "buckets": dict(zip(map(str, metric.buckets),
+                                                  metric.counts)),
+                              "p50": metric.quantile(0.5),
+                              "p99": metric.quantile(0.99)}
+        return json.dumps(data, indent=2)
+
+    def dump(self, path, fmt=None):
+        """Write every metric to a file.
+
+        Args:
+            path (str): file to write.
+            fmt (str): "json" or "prometheus". If not given, files ending in
+                .json get JSON and anything else gets Prometheus text.
+        """
+        if fmt is None:
+            fmt = "json" if path.endswith(".json") else "prometheus"
+        with open(path, "w") as f:
+            f.write(self.to_json() if fmt == "json" else self.to_prometheus())
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,215 @@
+"""
+Line protocol game server for the Spelling Bee MadLibs game.
+
+Runs many games at once in one process against the lexicon loaded by
+letterpotpoints.py. Every connection gets its own GameSession. The client
+sends one line at a time and gets one line back:
+
+    <word>          ->  VALID <points> <score> <possiblepoints>
+                        INVALID
+                        DUPLICATE
+    HELP [strategy] ->  HINT <hint>   or   NOHINT
+                        (strategy is letters, length, pos or best)
+    PREFIX <text>   ->  ALIVE <pos,pos,...>   or   DEAD
+                        (as-you-type check, nothing is scored)
+    NAME <name>     ->  OK
+    DONE            ->  MISSED <summary>, the filled story, then END
+    QUIT            ->  BYE
+
+A command with a missing or bad argument (a bare PREFIX or NAME, an unknown
+hint strategy) gets ERROR <reason> and is not taken as a guess.
+
+Right after connecting the server sends LETTERS <letterpot>. Connections that
+stay quiet for longer than the idle timeout get TIMEOUT and are closed. When
+the server is full new connections get BUSY and are closed. Every reply waits
+on writer.drain(), so a slow client only slows down its own session.
+
+Example Run Code:
+python3 gameserver.py samplestory.txt --port 8765
+"""
+
+import asyncio
+import sys
+from argparse import ArgumentParser
+
+import letterpotpoints
+from dawg import pot_dawg
+from leaderboard import Leaderboard
+
+MAX_LINE = 1024
+
+
+class GameServer:
+    """
+    Serves games over TCP, one GameSession per connection.
+    Attributes:
+        story (str): path to the story filled in when a player is done.
+        idle_timeout (float): seconds a connection may stay quiet.
+        max_sessions (int): most connections served at once.
+        leaderboard (Leaderboard): where finished games are saved, or None.
+        active (int): connections being served right now.
+        games_played (int): games that reached DONE.
+    """
+    def __init__(self, story, idle_timeout=300.0, max_sessions=10000,
+                 leaderboard=None):
+        self.story = story
+        self.leaderboard = leaderboard
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.active = 0
+        self.games_played = 0
+
+    async def start(self, host="127.0.0.1", port=8765):
+        """Start listening and return the asyncio server."""
+        return await asyncio.start_server(self.handle, host, port,
+                                          limit=MAX_LINE, backlog=1024)
+
+    async def handle(self, reader, writer):
+        """Run one game for one connection."""
+        if self.active >= self.max_sessions:
+            await self._send(writer, "BUSY")
+            await self._close(writer)
+            return
+        self.active += 1
+        try:
+            session = letterpotpoints.GameSession("guest")
+            await self._send(writer, f"LETTERS {session.letterpot}")
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(),
+                                                  self.idle_timeout)
+                except asyncio.TimeoutError:
+                    await self._send(writer, "TIMEOUT")
+                    break
+                except ValueError:
+                    # the line was longer than MAX_LINE
+                    await self._send(writer, "ERROR line too long")
+                    break
+                if not line:
+                    break
+                line = line.decode(errors="replace").strip()
+                await self._send(writer, self.respond(session, line))
+                command = line.upper()
+                if command == "DONE":
+                    self.games_played += 1
+                if command in ("DONE", "QUIT"):
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.active -= 1
+            await self._close(writer)
+
+    def respond(self, session, line):
+        """Work out the reply to one line from a client.
+
+        Args:
+            session (GameSession): the connection's game.
+            line (str): the line the client sent, without its newline.
+
+        Returns:
+            str: the reply.
+        """
+        # the first word decides whether the line is a command or a guess
+        command, _, argument = line.partition(" ")
+        command = command.upper()
+        argument = argument.strip()
+        if line.upper() == "QUIT":
+            return "BYE"
+        if command == "HELP":
+            strategy = argument.lower() or "letters"
+            if strategy not in letterpotpoints.HintEngine.STRATEGIES:
+                return f"ERROR unknown hint strategy {strategy}"
+            hint = session.hint(strategy)
+            if hint is None:
+                return "NOHINT"
+            return f"HINT {hint.splitlines()[-1]}"
+        if command == "PREFIX":
+            if not argument:
+                return "ERROR PREFIX needs some letters"
+            prefix = pot_dawg(session.letterpot).prefix_pos(argument.lower())
+            if not prefix:
+                return "DEAD"
+            return "ALIVE " + ",".join(sorted(prefix))
+        if command == "NAME":
+            if not argument:
+                return "ERROR NAME needs a name"
+            session.player.name = argument
+            return "OK"
+        if line.upper() == "DONE":
+            if self.leaderboard is not None:
+                # only queues the result, the write happens on another thread
+                self.leaderboard.record_session(session)
+            missed = letterpotpoints.missed_summary(session.letterpot,
+                                                    session.player,
+                                                    session.tracker)
+            story = session.fill_story(self.story)
+            return f"MISSED {missed}\n{story}\nEND"
+        if not line:
+            return "INVALID"
+        result = session.submit(line)
+        if result.status == "valid":
+            return (f"VALID {result.points:g} {result.score:g} "
+                    f"{result.possiblepoints:g}")
+        return result.status.upper()
+
+    async def _send(self, writer, reply):
+        writer.write(reply.encode() + b"\n")
+        await writer.drain()
+
+    async def _close(self, writer):
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def serve(story, host, port, idle_timeout, max_sessions,
+                leaderboard=None):
+    """Run a GameServer until it is cancelled."""
+    game_server = GameServer(story, idle_timeout, max_sessions, leaderboard)
+    server = await game_server.start(host, port)
+    print(f"Serving on {host}:{port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def parse_args(arglist):
+    """ Parse command-line arguments.
+
+    Expect one mandatory argument:
+        - story: a path to a file containing a fill-in-the-blank story
+
+    Args:
+        arglist (list of str): arguments from the command line.
+
+    Returns:
+        namespace: the parsed arguments, as a namespace.
+    """
+    parser = ArgumentParser()
+    parser.add_argument("story", help="Path to the TXT file containing story")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8765,
+                        help="Port to listen on")
+    parser.add_argument("--idle", type=float, default=300.0,
+                        help="Seconds before a quiet connection is closed")
+    parser.add_argument("--max-sessions", type=int, default=10000,
+                        help="Most games served at once")
+    parser.add_argument("--db", help="Path to a SQLite leaderboard to save "
+                        "finished games in")
+    return parser.parse_args(arglist)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    leaderboard = Leaderboard(args.db) if args.db else None
+    try:
+        asyncio.run(serve(args.story, args.host, args.port, args.idle,
+                          args.max_sessions, leaderboard))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if leaderboard is not None:
+            leaderboard.close()
@@ -0,0 +1,224 @@
+"""
+Saved results and leaderboards for the Spelling Bee MadLibs game.
+
+Keeps every finished game (player name, letterpot, score, guessed words and
+when it started and finished) in a local SQLite database in WAL mode.
+Recording a game only puts it on a queue; one background thread writes the
+queue out in batches, one transaction per batch, so games never wait on the
+disk. Indexes on (pot, score) and (player, finished_at) keep top-k per pot
+and a player's history fast even with tens of millions of rows.
+
+Example:
+    board = Leaderboard("scores.db")
+    board.record_session(session)     # returns right away
+    board.top("aceilms", 10)
+    board.close()
+"""
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    pot TEXT NOT NULL,
+    score REAL NOT NULL,
+    words TEXT NOT NULL,
+    started_at REAL,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_pot_score
+    ON results (pot, score DESC, finished_at);
+CREATE INDEX IF NOT EXISTS results_player_time
+    ON results (player, finished_at DESC);
+"""
+
+INSERT = ("INSERT INTO results (player, pot, score, words, started_at, "
+          "finished_at) VALUES (?, ?, ?, ?, ?, ?)")
+_STOP = object()
+# seconds to wait before each retry of a batch that failed to write
+RETRY_DELAYS = (0.1, 0.5, 2.0)
+
+log = logging.getLogger(__name__)
+
+
+class Leaderboard:
+    """
+    A results database with a background writer.
+    Attributes:
+        path (str): the SQLite file.
+        batch_size (int): most results written in one transaction.
+        written (int): results written so far.
+        dropped (int): results given up on after every retry failed.
+    """
+    def __init__(self, path, batch_size=500, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._closed = False
+        self._failed = None
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        connection.commit()
+        self._writer = threading.Thread(target=self._write_loop,
+                                        name="leaderboard-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _reader(self):
+        """Return this thread's read connection."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def record(self, player, letterpot, score, words, started_at=None,
+               finished_at=None):
+        """Queue one finished game to be saved. Never blocks.
+
+        Args:
+            player (str): the player's name.
+            letterpot (str): key of the letterpot played.
+            score (float): final score.
+            words (list of str): the words the player guessed.
+            started_at (float): when the game started (time.time()).
+            finished_at (float): when it finished, now if not given.
+
+        Raises:
+            RuntimeError: if the leaderboard is closed or its writer stopped.
+        """
+        if self._closed:
+            raise RuntimeError("leaderboard is closed")
+        if self._failed is not None:
+            raise RuntimeError("leaderboard writer stopped") from self._failed
+        if finished_at is None:
+            finished_at = time.time()
+        self._queue.put((player, letterpot, score, json.dumps(list(words)),
+                         started_at, finished_at))
+
+    def record_session(self, session):
+        """Queue the result of a GameSession."""
+        player = session.player
+        self.record(player.name, session.letterpot, player.score,
+                    player.guessed_words, session.started_at)
+
+    def _write_batch(self, connection, batch):
+        """Write one batch, retrying on database errors (a locked database,
+        a full disk). A batch that still fails is logged and dropped."""
+        for delay in RETRY_DELAYS + (None,):
+            try:
+                with connection:
+                    connection.executemany(INSERT, batch)
+                self.written += len(batch)
+                return
+            except sqlite3.Error as error:
+                if delay is None:
+                    log.error("dropped %d leaderboard results: %s",
+                              len(batch), error)
+                    self.dropped += len(batch)
+                    return
+                log.warning("leaderboard write failed, retrying: %s", error)
+                time.sleep(delay)
+
+    def _write_loop(self):
+        try:
+            self._write_queue()
+        except BaseException as error:
+            # nothing will write again, so fail new records and let flush()
+            # and close() return instead of waiting forever
+            self._failed = error
+            log.exception("leaderboard writer stopped")
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._queue.task_done()
+
+    def _write_queue(self):
+        connection = self._connect()
+        stop = False
+        while not stop:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            taken = 1
+            while True:
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+            try:
+                if batch:
+                    self._write_batch(connection, batch)
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+        connection.close()
+
+    def flush(self):
+        """Wait until every queued result has been written."""
+        self._queue.join()
+
+    def close(self):
+        """Write everything still queued and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._writer.join()
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def top(self, letterpot, k=10):
+        """Return the k best results for a letterpot, best first.
+
+        Returns:
+            list of dict: player, score, words and finished_at of each.
+        """
+        rows = self._reader().execute(
+            "SELECT player, score, words, finished_at FROM results "
+            "WHERE pot = ? ORDER BY score DESC, finished_at LIMIT ?",
+            (letterpot, k)).fetchall()
+        return [{"player": player, "score": score, "words": json.loads(words),
+                 "finished_at": finished_at}
+                for player, score, words, finished_at in rows]
+
+    def history(self, player, limit=20):
+        """Return a player's most recent results, newest first.
+
+        Returns:
+            list of dict: pot, score, words, started_at and finished_at.
+        """
+        rows = self._reader().execute(
+            "SELECT pot, score, words, started_at, finished_at FROM results "
+            "WHERE player = ? ORDER BY finished_at DESC LIMIT ?",
+            (player, limit)).fetchall()
+        return [{"pot": pot, "score": score, "words": json.loads(words),
+                 "started_at": started_at, "finished_at": finished_at}
+                for pot, score, words, started_at, finished_at in rows]
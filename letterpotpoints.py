@@ -18,7 +18,28 @@ python3 madlibs.py story1.txt
 import re
 import random
 from argparse import ArgumentParser
+from array import array
+from collections import OrderedDict
+from types import MappingProxyType
+import os
 import sys
+from time import perf_counter, time
+
+from binlexicon import BinaryLexicon
+from fillerpool import as_pool, load_filler as read_filler
+import gamemetrics
+
+metrics = gamemetrics.registry
+GUESS_SECONDS = metrics.histogram("madlibsbee_guess_seconds",
+                                  help="Time to check and score one guess")
+GUESS_COUNTS = {status: metrics.counter(f"madlibsbee_guesses_{status}_total",
+                                        help=f"Guesses that were {status}")
+                for status in ("valid", "invalid", "duplicate")}
+HINT_SECONDS = metrics.histogram("madlibsbee_hint_seconds",
+                                 help="Time to build one hint (refused "
+                                 "hints are not counted)")
+STORY_SECONDS = metrics.histogram("madlibsbee_story_render_seconds",
+                                  help="Time to fill in one story")
 
 letterpots = {
     "ehprsyz": [
@@ -136,6 +157,13 @@ fillerpartofspeech = {
     ]}
 
 
+# a placeholder is one line and at most MAX_PLACEHOLDER characters between
+# its brackets; a "<" with no ">" close enough after it is plain text
+MAX_PLACEHOLDER = 64
+PLACEHOLDER = re.compile(rf'<([^>\n]{{0,{MAX_PLACEHOLDER}}})>')
+POS_PLACEHOLDER = re.compile(r"(noun|verb|adjective|plural noun)")
+
+
 # HERE IS OLD STORY. COMMENTING OUT IN CASE TO TEST CUSTOM STORY FUNCTIONALITY
 # story = """
 # Just when it seemed every noun1 under the noun2  had been named, 
@@ -146,33 +174,75 @@ fillerpartofspeech = {
 class Player:
     """
     A class to represent the player.
+
+    Kept small so a server can hold lots of them: guesses that are words in
+    the player's pot are one bit each in a bitset over the pot's words (the
+    PotScores is shared, not copied), and only guesses outside the pot are
+    kept as strings. Without a pot every guess is kept as a string.
     Attributes:
         name (str): Player's name.
         score (int): Player's total score.
-        guessed_words (list): List of valid words the player has guessed.
+        pot (PotScores): scoring data of the pot being played, or None.
+        invalid (dict): guesses that are not words in the pot, as keys in
+            the order they were guessed (a dict so lookups are O(1)).
+        guessed_words (tuple): every word the player has guessed, the pot's
+            words first (best scoring first) and then the others. It is built
+            on each read, so assign a new list to change it.
     """
-    def __init__(self, name):
+    __slots__ = ("name", "score", "pot", "invalid", "_found")
+
+    def __init__(self, name, pot=None):
         self.name = name
         self.score = 0
-        
-        self.guessed_words = []
+        self.pot = pot
+        self.invalid = {}
+        self._found = bytearray((len(pot.ranked) + 7) >> 3) if pot else None
+
+    @property
+    def guessed_words(self):
+        words = []
+        if self._found:
+            ranked = self.pot.ranked
+            for byte_index, byte in enumerate(self._found):
+                while byte:
+                    low = byte & -byte
+                    words.append(ranked[(byte_index << 3) + low.bit_length() - 1])
+                    byte ^= low
+        words.extend(self.invalid)
+        return tuple(words)
+
+    @guessed_words.setter
+    def guessed_words(self, words):
+        self.invalid = {}
+        if self._found:
+            self._found = bytearray(len(self._found))
+        for word in words:
+            self.guess_word(word)
 
     def add_score(self, points):
         self.score += points
 
     def guess_word(self, word):
-        self.guessed_words.append(word)
+        i = self.pot.word_index.get(word) if self.pot else None
+        if i is None:
+            self.invalid[word] = None
+        else:
+            self._found[i >> 3] |= 1 << (i & 7)
+
+    def has_guessed(self, word):
+        """Check whether the player already guessed word, in O(1)."""
+        i = self.pot.word_index.get(word) if self.pot else None
+        if i is None:
+            return word in self.invalid
+        return bool(self._found[i >> 3] >> (i & 7) & 1)
     
     def pos_guess(self, partofspeech_dict):
         pos = {"noun":[], "plural noun":[], "verb":[], "adjective":[]}
+        index = lexicon_for(partofspeech_dict)
         for word in self.guessed_words:
-            count = 0
-            for i in partofspeech_dict:
-                if word in partofspeech_dict[i]:
-                    pos[i].append(word)
-                    count += 1
-            if count == 0:
-                pass
+            #a word like "calm" goes in every part of speech it belongs to
+            for i in index.pos_of(word):
+                pos.setdefault(i, []).append(word)
         return pos
 
     def __str__(self):
@@ -204,8 +274,21 @@ def totalpoints(letterpot):
         
     Written by: Nell Yonkos
     """
+    return score_letters(letterpots[letterpot])
+
+
+def score_letters(words):
+    """Does the work for totalpoints() on any list of words, so pots that are
+    not in the letterpots dictionary (generated or cached ones) can be scored
+    the same way.
+
+    Args:
+        words (list of str): all of the words that can be made from a pot.
+
+    Returns:
+        tuple: (letterpoints, lettercount), the same as totalpoints().
+    """
     #get count of each letter in all letterpot words
-    words = letterpots[letterpot]
     lettercount = {}
     for word in words:
         for letter in word:
@@ -238,7 +321,288 @@ def totalpoints(letterpot):
             letterpoints[letter] = round(1 + score * 9, 0) #10-1 scale
 
     return letterpoints, lettercount
-    
+
+
+class PotScores:
+    """
+    Everything scoring needs to know about one letterpot, worked out once.
+    Attributes:
+        key (str): the letterpot key.
+        letterpoints (dict): point value of each letter (from totalpoints).
+        lettercount (dict): how often each letter shows up in the pot's words.
+        possiblepoints (int): total points for finding every word in the pot.
+        wordpoints (dict): points earned for each word in the pot.
+        ranked (list of str): the pot's words, highest scoring first.
+        word_index (dict): each word's position in ranked.
+        playable (list of str): the ranked words that have a part of speech,
+            which are the only ones a player can score.
+        pos_totals (dict): number of playable words for each part of speech.
+    """
+    def __init__(self, key, words):
+        self.key = key
+        self.letterpoints, self.lettercount = score_letters(words)
+        self.possiblepoints = 0
+        for letter in self.lettercount:
+            self.possiblepoints += (self.lettercount[letter]
+                                    * self.letterpoints[letter])
+        self.wordpoints = {}
+        for word in words:
+            self.wordpoints[word] = sum(self.letterpoints[letter]
+                                        for letter in word)
+        self.ranked = sorted(self.wordpoints,
+                             key=lambda word: (-self.wordpoints[word], word))
+        self.word_index = {word: i for i, word in enumerate(self.ranked)}
+        self.playable = []
+        self.pos_totals = dict.fromkeys(lexicon.pos_order, 0)
+        for word in self.ranked:
+            types = lexicon.pos_of(word)
+            if types:
+                self.playable.append(word)
+            for pos in types:
+                self.pos_totals[pos] += 1
+
+
+class PotScoreCache:
+    """
+    Keeps PotScores for the most recently used letterpots so a guess only
+    costs a dictionary lookup instead of rescoring the whole pot. When there
+    are more than maxsize pots cached, the least recently used one is dropped.
+    Attributes:
+        maxsize (int): the most pots kept at once.
+        hits (int): lookups answered from the cache.
+        misses (int): lookups that had to score the pot.
+        evictions (int): pots dropped to stay under maxsize.
+    """
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, letterpot_key, words=None):
+        """Return the PotScores for a letterpot, scoring it on a miss.
+
+        Args:
+            letterpot_key (str): key of the pot.
+            words (list of str): the pot's words, only needed for pots that
+                are not in letterpots.
+
+        Returns:
+            PotScores: the cached scoring data for the pot.
+        """
+        entry = self._entries.get(letterpot_key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(letterpot_key)
+            return entry
+        self.misses += 1
+        if words is None:
+            words = letterpots[letterpot_key]
+        entry = PotScores(letterpot_key, words)
+        self._entries[letterpot_key] = entry
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def invalidate(self, letterpot_key=None):
+        """Forget a pot after its word list changes (or every pot if no key
+        is given) so it is rescored on the next lookup.
+        """
+        if letterpot_key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(letterpot_key, None)
+
+    def stats(self):
+        """Return the hit/miss/eviction counters as a dictionary."""
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "size": len(self._entries),
+                "maxsize": self.maxsize}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, letterpot_key):
+        return letterpot_key in self._entries
+
+
+pot_cache = PotScoreCache()
+
+
+class LexiconIndex:
+    """
+    Read-only lookup tables built once from letterpots and partofspeech_dict,
+    so checking a guess is a set lookup instead of scanning every list.
+    Attributes:
+        partofspeech (dict): the part of speech dictionary it was built from.
+        pos_order (tuple): parts of speech in the order of that dictionary.
+        word_pos (mapping): word -> frozenset of its parts of speech.
+        pot_words (mapping): letterpot key -> frozenset of its words.
+            Pots put straight into letterpots later are not in it; use pot().
+    """
+    def __init__(self, letterpots, partofspeech_dict):
+        self._letterpots = letterpots
+        self._late_pots = {}
+        self.partofspeech = partofspeech_dict
+        self.pos_order = tuple(partofspeech_dict)
+        word_pos = {}
+        for pos in partofspeech_dict:
+            for word in partofspeech_dict[pos]:
+                word_pos.setdefault(word, set()).add(pos)
+        self.word_pos = MappingProxyType(
+            {word: frozenset(word_pos[word]) for word in word_pos})
+        self.pot_words = MappingProxyType(
+            {key: frozenset(letterpots[key]) for key in letterpots})
+
+    def pos_of(self, word):
+        """Return every part of speech of a word (empty if it has none)."""
+        return self.word_pos.get(word, frozenset())
+
+    def word_type(self, word):
+        """Return the first part of speech of a word, in pos_order, or None."""
+        types = self.word_pos.get(word)
+        if types:
+            for pos in self.pos_order:
+                if pos in types:
+                    return pos
+        return None
+
+    def has_pos(self, word, pos):
+        """Check whether a word can be used as a part of speech."""
+        return pos in self.word_pos.get(word, ())
+
+    def pot(self, letterpot_key):
+        """Return a letterpot's words as a frozenset. A pot added straight
+        to letterpots after the index was built (e.g. from potgen.py) is
+        indexed the first time it is asked for. Unknown pots raise KeyError
+        just like indexing letterpots does."""
+        words = self.pot_words.get(letterpot_key)
+        if words is not None:
+            return words
+        source = self._letterpots[letterpot_key]
+        cached = self._late_pots.get(letterpot_key)
+        if cached is None or cached[0] is not source or cached[1] != len(source):
+            cached = (source, len(source), frozenset(source))
+            self._late_pots[letterpot_key] = cached
+        return cached[2]
+
+    def in_pot(self, letterpot_key, word):
+        """Check whether a word is in a letterpot. Unknown pots raise KeyError
+        just like indexing letterpots does."""
+        return word in self.pot(letterpot_key)
+
+    def with_pot(self, letterpot_key, words):
+        """Return a copy of the index with one letterpot added or replaced.
+        The word -> part of speech table is shared, not copied."""
+        index = object.__new__(LexiconIndex)
+        index._letterpots = self._letterpots
+        index._late_pots = {key: cached for key, cached in self._late_pots.items()
+                            if key != letterpot_key}
+        index.partofspeech = self.partofspeech
+        index.pos_order = self.pos_order
+        index.word_pos = self.word_pos
+        pot_words = dict(self.pot_words)
+        pot_words[letterpot_key] = frozenset(words)
+        index.pot_words = MappingProxyType(pot_words)
+        return index
+
+
+lexicon = LexiconIndex(letterpots, partofspeech_dict)
+
+
+_other_indexes = OrderedDict()
+
+
+def lexicon_for(partofspeech_dict):
+    """Return the index for a part of speech dictionary. The game's own
+    dictionary uses the prebuilt lexicon. Indexes for other dictionaries are
+    kept for the few most recently used ones and rebuilt if a list in the
+    dictionary is swapped out or changes length.
+    """
+    if partofspeech_dict is lexicon.partofspeech:
+        return lexicon
+    fingerprint = tuple((pos, id(words), len(words))
+                        for pos, words in partofspeech_dict.items())
+    cached = _other_indexes.get(id(partofspeech_dict))
+    if cached is not None and cached[0] is partofspeech_dict and cached[1] == fingerprint:
+        _other_indexes.move_to_end(id(partofspeech_dict))
+        return cached[2]
+    index = LexiconIndex({}, partofspeech_dict)
+    # the dictionary is kept in the entry so its id cannot be reused
+    _other_indexes[id(partofspeech_dict)] = (partofspeech_dict, fingerprint, index)
+    if len(_other_indexes) > 16:
+        _other_indexes.popitem(last=False)
+    return index
+
+
+def load_lexicon(path):
+    """Switch the game over to a compiled lexicon file (see binlexicon.py).
+    The file is opened with mmap and words are only decoded when a guess,
+    pot or score needs them, so startup does not depend on its size.
+
+    Args:
+        path (str): path to a file written by binlexicon.build_lexicon().
+    """
+    use_lexicon(BinaryLexicon.open(path))
+
+
+def use_lexicon(binary_lexicon):
+    """Switch the game over to an already opened BinaryLexicon, e.g. one
+    attached from shared memory (see sharedlexicon.py).
+
+    Args:
+        binary_lexicon (BinaryLexicon): the lexicon to play from.
+    """
+    global lexicon, letterpots, partofspeech_dict
+    lexicon = binary_lexicon
+    letterpots = lexicon.letterpots
+    partofspeech_dict = lexicon.partofspeech
+    pot_cache.invalidate()
+
+
+def load_filler(path):
+    """Switch the blanks the player's words cannot fill over to filler words
+    loaded from a file or directory (see fillerpool.py). Parts of speech the
+    files leave out keep the built in filler words.
+
+    Args:
+        path (str): a directory of per part of speech word files or one tab
+            separated file.
+    """
+    global fillerpartofspeech
+    fillerpartofspeech = {**fillerpartofspeech, **read_filler(path)}
+
+
+def random_letterpot(rng=random):
+    """Pick a random letterpot key without listing every key of a compiled
+    lexicon."""
+    if isinstance(letterpots, dict):
+        return rng.choice(list(letterpots.keys()))
+    return lexicon.key(rng.randrange(len(letterpots)))
+
+
+def add_letterpot(letterpot_key, words):
+    """Add a letterpot (or replace its word list) and keep the lexicon index
+    and score cache in step with it.
+
+    Args:
+        letterpot_key (str): key of the pot, e.g. "aceilms".
+        words (list of str): all of the words that can be made from the pot.
+    """
+    global lexicon, letterpots
+    if isinstance(letterpots, dict):
+        letterpots[letterpot_key] = list(words)
+        lexicon = lexicon.with_pot(letterpot_key, words)
+    else:
+        # a BinaryLexicon's file is read only, so the pot goes in a copy
+        # that keeps added pots in memory on top of the file
+        lexicon = lexicon.with_pot(letterpot_key, words)
+        letterpots = lexicon.letterpots
+    pot_cache.invalidate(letterpot_key)
     
     
 def extract_placeholders(story):
@@ -259,11 +623,11 @@ def extract_placeholders(story):
     """
     
 
-    return re.findall(r'<(.*?)>', story)
+    return PLACEHOLDER.findall(story)
 
 
 
-def help(letterpot):
+def help(letterpot, guessed_words=()):
     """Takes the words out of a dictionary of words corresponding to the chosen
     7 letters and filters out the guessed words. Prints out a word that has been
     randomly chosen from the unguessed words as the first and last letters of 
@@ -274,31 +638,133 @@ def help(letterpot):
         and a list of strings as value. The list of strings is all of the 4+ 
         letter words that can be made with the 7 characters. (This will most 
         likely be done in a class, but is here for interim deliverable)
+        guessed_words (list of str): words the player already guessed.
         
     Skill from list: 
         f-string containing expression
         list comprehension
     """
-    
-    #Initializes a dictionary for the words and a list of guesses made
-    #This will most likely be done in a class (not directly in here)
-    words = letterpots[letterpot]
-    
-    #Initialized a new list then appends unguessed words to that list
-    temp_list = [word for word in words 
-        if word not in Player.guessed_words and word not in temp_list]
-            
-    #Pulls a random word out of the temporary list and uses it as a help word
-    help_word = random.choice(temp_list)
-    temp_list.remove(help_word)
-    
-    #Create a length of the word where the middle letters are the "-" symbol
-    space_length = (len(help_word) - 2) * "-"
-    
-    #Print the first and last letters of the word with the middle "-" symbols
-    print(f"Here is your hint\n{help_word[0] + space_length + help_word[-1]}")
-    
+    print(HintEngine(letterpot, guessed_words=guessed_words).hint())
+
+
+class RemainingWords:
+    """
+    The words a player has not found yet. Removing a word swaps the last word
+    into its spot, so removing and picking a random word are both O(1).
+    """
+    def __init__(self, words):
+        self._words = list(dict.fromkeys(words))
+        self._index = {word: i for i, word in enumerate(self._words)}
+
+    def remove(self, word):
+        """Remove a word. Returns False if it was not there."""
+        i = self._index.pop(word, None)
+        if i is None:
+            return False
+        last = self._words.pop()
+        if i < len(self._words):
+            self._words[i] = last
+            self._index[last] = i
+        return True
+
+    def pick(self, rng=random):
+        """Return a random remaining word, or None if there are none."""
+        if not self._words:
+            return None
+        return self._words[rng.randrange(len(self._words))]
+
+    def __contains__(self, word):
+        return word in self._index
+
+    def __len__(self):
+        return len(self._words)
+
+    def __iter__(self):
+        return iter(self._words)
+
+
+class HintEngine:
+    """
+    Gives hints about the words a player has not found yet and keeps track of
+    how many hints they have left.
+    Attributes:
+        letterpot (str): key of the letterpot being played.
+        help_points (int): hints the player has left.
+        remaining (RemainingWords): playable words not found yet.
+    Hint strategies:
+        "letters": first and last letter of a random word, like c---e
+        "length": how long a random word is
+        "pos": the part of speech and first letter of a random word
+        "best": the highest scoring word left, shown as its first and last
+            letters
+    """
+    STRATEGIES = ("letters", "length", "pos", "best")
+
+    def __init__(self, letterpot, scores=None, help_points=1,
+                 guessed_words=(), rng=random):
+        self.letterpot = letterpot
+        self.scores = scores if scores is not None else pot_cache.get(letterpot)
+        self.help_points = help_points
+        self.rng = rng
+        #only words that can be scored are worth a hint
+        self.remaining = RemainingWords(self.scores.playable)
+        self._best = 0
+        for word in guessed_words:
+            self.remaining.remove(word)
+
+    def guessed(self, word):
+        """Stop giving hints for a word once the player has found it."""
+        self.remaining.remove(word)
+
+    def best_word(self):
+        """Return the highest scoring word left, or None."""
+        ranked = self.scores.playable
+        #the cursor only moves forward, so this is O(1) spread over a game
+        while self._best < len(ranked) and ranked[self._best] not in self.remaining:
+            self._best += 1
+        if self._best == len(ranked):
+            return None
+        return ranked[self._best]
+
+    def hint(self, strategy="letters"):
+        """Use up a hint point and return a hint.
+
+        Args:
+            strategy (str): one of STRATEGIES.
+
+        Returns:
+            str: the hint, or None if the player is out of hint points. No
+            point is used up when there is nothing left to hint at.
 
+        Raises:
+            ValueError: if strategy is not one of STRATEGIES.
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown hint strategy: {strategy}")
+        if self.help_points < 1:
+            return None
+        if strategy == "best":
+            help_word = self.best_word()
+        else:
+            help_word = self.remaining.pick(self.rng)
+        if help_word is None:
+            return "There are no words left to give a hint for!"
+        self.help_points -= 1
+
+        #Create a length of the word where the middle letters are the "-" symbol
+        space_length = (len(help_word) - 2) * "-"
+        if strategy == "length":
+            hint = f"There is a {len(help_word)} letter word you haven't found"
+        elif strategy == "pos":
+            pos = lexicon.word_type(help_word)
+            hint = f"There is a {pos} starting with \"{help_word[0]}\" you haven't found"
+        elif strategy == "best":
+            points = self.scores.wordpoints[help_word]
+            hint = f"The best word left is worth {points:g} points: {help_word[0] + space_length + help_word[-1]}"
+        else:
+            hint = help_word[0] + space_length + help_word[-1]
+        return f"Here is your hint\n{hint}"
+    
 
 def isvalid(letterpot_key, userinput, wordtype):
     """
@@ -320,11 +786,11 @@ def isvalid(letterpot_key, userinput, wordtype):
         raise ValueError("This is nto a valid word! Too short!")
      
     # Check if word is valid according to letterpot
-    if userinput not in letterpots[letterpot_key]:
+    if not lexicon.in_pot(letterpot_key, userinput):
         raise ValueError("This is not a valid Word!")
          
     # Check if word is valid according to wordtype constraint
-    if userinput not in partofspeech_dict.get(wordtype, []):
+    if not lexicon.has_pos(userinput, wordtype):
         raise ValueError ("This is not a valid word! (Wrong Type)")
     else:
         
@@ -357,16 +823,10 @@ def inputpoints(inputword, letterpot, wordtype):
     Written by: Nell Yonkos    
     """
     
-    letterpoints, lettercount = totalpoints(letterpot) 
-    possiblepoints = 0
-    earnedpoints = 0
-    for letter in lettercount:
-        possiblepoints += lettercount[letter] * letterpoints[letter]
+    scores = pot_cache.get(letterpot)
     try:
         isvalid(letterpot, inputword, wordtype)
-        for letter in inputword:
-            earnedpoints += letterpoints[letter]
-        return earnedpoints, possiblepoints
+        return scores.wordpoints[inputword], scores.possiblepoints
 
     except ValueError:
         return "Invalid word!"
@@ -388,68 +848,334 @@ def auto_fill_story(story, player, fillerpartofspeech):
     Returns:
         str: The completed story with all placeholders replaced with valid words.
     """
+    # the story is split into text and placeholders once and cached, so
+    # filling it is just a lookup per placeholder and one join
+    if not metrics.enabled:
+        template = compile_story(story)
+        return template.render(SlotFiller(player, fillerpartofspeech))
+    began = perf_counter()
+    text = compile_story(story).render(SlotFiller(player, fillerpartofspeech))
+    STORY_SECONDS.observe(perf_counter() - began)
+    return text
+
+
+class StoryTemplate:
+    """
+    A story split once into its plain text and its placeholders.
+    Attributes:
+        parts (list of str): the story cut at each placeholder. Even indexes
+            are plain text and odd indexes are placeholder names.
+        slots (list of str): the placeholder names in story order.
+    """
+    def __init__(self, text):
+        self.parts = PLACEHOLDER.split(text)
+        self.slots = self.parts[1::2]
+
+    def render(self, fill):
+        """Put the story back together with each placeholder replaced.
+
+        Args:
+            fill (dict): placeholder -> word. A placeholder that shows up more
+                than once gets the same word every time.
+
+        Returns:
+            str: the filled in story.
+        """
+        parts = self.parts[:]
+        parts[1::2] = [fill[slot] for slot in self.slots]
+        return "".join(parts)
+
+
+# most compiled stories kept at once, least recently used dropped first
+TEMPLATE_CACHE_SIZE = 32
+_template_cache = OrderedDict()
+
+
+def compile_story(story):
+    """Read and split a story file, reusing the last result until the file
+    changes. Only the TEMPLATE_CACHE_SIZE most recently used stories are
+    kept.
+
+    Args:
+        story (str): path to a text file containing a story.
+
+    Returns:
+        StoryTemplate: the compiled story.
+    """
+    mtime = os.stat(story).st_mtime_ns
+    cached = _template_cache.get(story)
+    if cached is not None and cached[0] == mtime:
+        _template_cache.move_to_end(story)
+        return cached[1]
     with open(story, 'r') as f:
-        text = f.read()
-    # extract_placeholders extracts all the placeholders in story,
-    # use this function to substitute the extracted placeholders
-    placeholders = extract_placeholders(text)
-    
-    filled = {}
-    used_words = {}
-    
-    player_pos_words = player.pos_guess(partofspeech_dict)
+        template = StoryTemplate(f.read())
+    _template_cache[story] = (mtime, template)
+    _template_cache.move_to_end(story)
+    if len(_template_cache) > TEMPLATE_CACHE_SIZE:
+        _template_cache.popitem(last=False)
+    return template
 
-    
-    
-    for pos in fillerpartofspeech:
-        used_words[pos] = []
-        
 
-    for placeholder in placeholders:
-        match = re.match(r"(noun|verb|adjective|plural noun)", placeholder)
-        if match:
-            pos = match.group(1)
-            if placeholder not in filled:
-                #user input words first
-                #playerwords = player_pos_words.get(pos, [])
-
-                shouldpull = [w for w in player_pos_words.get(pos, []) if w not in used_words[pos]]
-
-                #after user input words have been used up, use filler word dictionary
-                if not shouldpull: 
-                    shouldpull = [w for w in fillerpartofspeech[pos] if w not in used_words[pos]]
-                            
-                if shouldpull:
-                    index = random.randint(0, len(shouldpull) - 1)
-                    first = shouldpull[index]
-                    used_words[pos].append(first)
-                    filled[placeholder] = first
-                else:
-                    filled[placeholder] = "square"
-                            
-    for placeholder in placeholders:
-        if placeholder in filled: 
-            #1 bc only want to replace first occurance only. that way each is unique            
-            text = text.replace(f"<{placeholder}>", filled[placeholder], 1)
-    
-    return text
+class SlotFiller(dict):
+    """
+    Picks a word for each placeholder the first time it is asked for, player
+    words first and then filler words, and remembers it for repeats.
+    Placeholders that are not a part of speech are left as they are. Pass
+    rng (a random.Random) to make the picks reproducible.
+
+    Words are drawn from FillerPool samplers (see fillerpool.py), so each
+    placeholder costs O(1) however many filler words there are. When the
+    filler words for a part of speech run out they are reused; a part of
+    speech with no filler words at all reuses the player's words, and only
+    if there are none of those either is the placeholder left as it is.
+    """
+    def __init__(self, player, fillerpartofspeech, rng=random):
+        super().__init__()
+        self.player_pos_words = player.pos_guess(partofspeech_dict)
+        self.fillerpartofspeech = fillerpartofspeech
+        self.used_words = {}
+        self.rng = rng
+        self._player_samplers = {}
+        self._filler_samplers = {}
+
+    def _sampler(self, samplers, words, pos):
+        sampler = samplers.get(pos)
+        if sampler is None:
+            sampler = samplers[pos] = as_pool(words.get(pos, ())).sampler(self.rng)
+        return sampler
+
+    def __missing__(self, placeholder):
+        match = POS_PLACEHOLDER.match(placeholder)
+        if not match:
+            return f"<{placeholder}>"
+        pos = match.group(1)
+        used = self.used_words.setdefault(pos, set())
+
+        #user input words first
+        mine = self._sampler(self._player_samplers, self.player_pos_words, pos)
+        word = mine.draw()
+
+        #after user input words have been used up, use filler word dictionary
+        if word is None:
+            filler = self._sampler(self._filler_samplers, self.fillerpartofspeech, pos)
+            word = filler.draw(used)
+            if word is None and filler.pool.drawable:
+                #every filler word has been used, so start reusing them
+                filler.reset()
+                word = filler.draw()
+            elif word is None and mine.pool.drawable:
+                mine.reset()
+                word = mine.draw()
+
+        if word is None:
+            word = f"<{placeholder}>"
+        else:
+            used.add(word)
+        self[placeholder] = word
+        return word
+
+
+STREAM_CHUNK = 1 << 16
+
+
+def stream_story(story, player, fillerpartofspeech, chunk_size=STREAM_CHUNK):
+    """
+    Fills in a story the same way auto_fill_story() does, but reads the file
+    a chunk at a time and yields the filled text as it goes, so memory stays
+    flat no matter how big the story is. A placeholder cut in half by a chunk
+    boundary is held back until the rest of it has been read, but never more
+    than MAX_PLACEHOLDER characters of it, so a stray "<" cannot hold back
+    the rest of a long line.
+
+    Args:
+        story (str): path to a text file containing a story.
+        player (object): object with method pos_guess().
+        fillerpartofspeech (dict): backup words for each part of speech.
+        chunk_size (int): number of characters to read at a time.
+
+    Yields:
+        str: the next piece of the filled in story.
+    """
+    pieces = _stream_pieces(story, player, fillerpartofspeech, chunk_size)
+    if not metrics.enabled:
+        yield from pieces
+        return
+    # only the time spent making pieces counts, not the time the caller
+    # takes to write them out; a story that is not read to the end is not
+    # recorded
+    busy = 0.0
+    while True:
+        began = perf_counter()
+        piece = next(pieces, None)
+        busy += perf_counter() - began
+        if piece is None:
+            break
+        yield piece
+    STORY_SECONDS.observe(busy)
+
+
+def _stream_pieces(story, player, fillerpartofspeech, chunk_size):
+    """The work behind stream_story(), without the timing."""
+    fill = SlotFiller(player, fillerpartofspeech)
+    pending = ""
+    with open(story, 'r') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            # pending is at most a short "<..." with no ">" in it, so text is
+            # never much longer than a chunk
+            text = pending + chunk
+            pieces = []
+            done = 0
+            # every placeholder ends in a ">", so without one in the new chunk
+            # there is nothing to match
+            if ">" in chunk:
+                for match in PLACEHOLDER.finditer(text):
+                    pieces.append(text[done:match.start()])
+                    pieces.append(fill[match.group(1)])
+                    done = match.end()
+            # only a "<" after the last newline and close enough to the end to
+            # still fit a placeholder can turn into one once more text is read
+            cut = text.find("<", max(done, text.rfind("\n", done) + 1,
+                                     len(text) - MAX_PLACEHOLDER - 1))
+            if cut == -1:
+                cut = len(text)
+            pieces.append(text[done:cut])
+            pending = text[cut:]
+            piece = "".join(pieces)
+            if piece:
+                yield piece
+    # whatever is still held back never got its ">" so it is plain text
+    if pending:
+        yield pending
+
     
-def missed_words(letterpot_key, player):
+def missed_words(letterpot_key, player, tracker=None):
     """
-    Displays how many valid words were missed by the player using set operations.
+    Displays how many valid words were missed by the player, the best ones
+    they missed and how much of each part of speech they found.
     
     Args:
         letterpot_key (str): The key to access the letterpot list of valid words.
         player (Player): The Player object containing guessed words.
+        tracker (SessionTracker): the game's tracker, if it has one. Without
+            one, a tracker is built from the player's guessed words.
     
     Side Effects:
         Prints number of missed words and optionally a few examples.
     """
-    all_valid = set(letterpots[letterpot_key])
-    guessed = set(player.guessed_words)
-    missed = all_valid.difference(guessed)
+    print(missed_summary(letterpot_key, player, tracker))
+
+
+def missed_summary(letterpot_key, player, tracker=None):
+    """Builds the report missed_words() prints.
 
-    print(f"You missed {len(missed)} words. Here's a few: {random.sample(list(missed), min(5, len(missed)))}")
+    Args:
+        letterpot_key (str): The key to access the letterpot list of valid words.
+        player (Player): The Player object containing guessed words.
+        tracker (SessionTracker): the game's tracker, if it has one.
+
+    Returns:
+        str: the end of game report.
+    """
+    if tracker is None:
+        tracker = SessionTracker.for_player(pot_cache.get(letterpot_key),
+                                            player)
+    return tracker.summary()
+
+
+class SessionTracker:
+    """
+    Keeps the end of game numbers up to date as each valid guess is scored,
+    so the report at the end never has to look through the whole pot. Which
+    words were found is read from the player's guesses, so the tracker only
+    keeps the running counts.
+    Attributes:
+        scores (PotScores): scoring data for the letterpot.
+        player (Player): the player whose words are counted.
+        found (int): playable words the player found.
+        found_points (int): points for the found words.
+        pos_found (array): found words for each part of speech, in the
+            order of scores.pos_totals.
+    """
+    __slots__ = ("scores", "player", "found", "found_points", "pos_found")
+
+    def __init__(self, scores, player):
+        self.scores = scores
+        self.player = player
+        self.found = 0
+        self.found_points = 0
+        self.pos_found = array("I", bytes(4 * len(scores.pos_totals)))
+
+    @classmethod
+    def for_player(cls, scores, player):
+        """Make a tracker that has already counted the player's guesses."""
+        tracker = cls(scores, player)
+        for word in player.guessed_words:
+            tracker._count(word)
+        return tracker
+
+    def record(self, word):
+        """Count a found word. Call it before the guess is added to the
+        player: words the player already guessed, or that are not playable
+        in this pot, are ignored."""
+        if not self.player.has_guessed(word):
+            self._count(word)
+
+    def _count(self, word):
+        points = self.scores.wordpoints.get(word)
+        if points is None:
+            return
+        types = lexicon.pos_of(word)
+        if not types:
+            return
+        self.found += 1
+        self.found_points += points
+        for i, pos in enumerate(self.scores.pos_totals):
+            if pos in types:
+                self.pos_found[i] += 1
+
+    @property
+    def missed_count(self):
+        return len(self.scores.playable) - self.found
+
+    def top_missed(self, n=5):
+        """Return the n highest scoring words the player missed, best first.
+        Walks the pot's ranked list, so it costs O(n + words found)."""
+        missed = []
+        for word in self.scores.playable:
+            if len(missed) == n:
+                break
+            if not self.player.has_guessed(word):
+                missed.append(word)
+        return missed
+
+    def percent_found(self):
+        """Return the found points as a percentage of the possible points."""
+        if not self.scores.possiblepoints:
+            return 0.0
+        return 100 * self.found_points / self.scores.possiblepoints
+
+    def report(self, n=5):
+        """Return the end of game numbers as a dictionary."""
+        totals = self.scores.pos_totals
+        return {"found": self.found, "missed": self.missed_count,
+                "top_missed": [(word, self.scores.wordpoints[word])
+                               for word in self.top_missed(n)],
+                "pos_coverage": {pos: (found, totals[pos]) for pos, found
+                                 in zip(totals, self.pos_found)},
+                "percent_points": self.percent_found()}
+
+    def summary(self, n=5):
+        """Return the end of game report as text for the player."""
+        best = ", ".join(f"{word} ({self.scores.wordpoints[word]:g})"
+                         for word in self.top_missed(n))
+        totals = self.scores.pos_totals
+        coverage = ", ".join(f"{pos} {found}/{totals[pos]}"
+                             for pos, found in zip(totals, self.pos_found))
+        return (f"You missed {self.missed_count} words. The best ones you missed: {best}\n"
+                f"You found {self.percent_found():.0f}% of the possible points. ({coverage})")
 
 
 def get_word_type(word, partofspeech_dict):
@@ -462,11 +1188,179 @@ def get_word_type(word, partofspeech_dict):
     Returns: 
         str: the part of speech key from partofspeech_dict of the word
     """
-    for i in partofspeech_dict:
-        if word in partofspeech_dict[i]:
-            return i
+    return lexicon_for(partofspeech_dict).word_type(word)
+
+
+class GuessResult:
+    """
+    What happened to one guess in a GameSession.
+    Attributes:
+        word (str): the guess, lowercased.
+        status (str): "valid", "invalid" or "duplicate".
+        wordtype (str): part of speech of a valid guess, otherwise None.
+        points (int): points earned for this guess (0 unless valid).
+        score (int): the player's score after this guess.
+        possiblepoints (int): points for finding every word in the pot.
+    """
+    def __init__(self, word, status, wordtype, points, score, possiblepoints):
+        self.word = word
+        self.status = status
+        self.wordtype = wordtype
+        self.points = points
+        self.score = score
+        self.possiblepoints = possiblepoints
+
+    @property
+    def message(self):
+        """The line play() prints for this guess."""
+        if self.status == "duplicate":
+            return "You've already guessed that."
+        if self.status == "invalid":
+            return "Invalid word!"
+        return f"You've found {self.score} out of {self.possiblepoints} possible."
+
+    def as_dict(self):
+        return {"word": self.word, "status": self.status,
+                "wordtype": self.wordtype, "points": self.points,
+                "score": self.score, "possiblepoints": self.possiblepoints}
+
+    def __repr__(self):
+        return f"GuessResult({self.word!r}, {self.status!r}, {self.points})"
+
+
+class GameSession:
+    """
+    One game without any input() or print(), so it can be driven by play(),
+    a server or a test.
+    Attributes:
+        player (Player): the player for this game.
+        letterpot (str): key of the letterpot being played.
+        scores (PotScores): precomputed scoring data for the letterpot.
+        hints (HintEngine): hints and hint points for this game, made the
+            first time it is used so games without hints never build one.
+        tracker (SessionTracker): running end of game numbers.
+        help_points (int): hints the player has left.
+        started_at (float): when the game started, from time.time().
+    """
+    __slots__ = ("letterpot", "scores", "player", "_hints", "_help_points",
+                 "tracker", "started_at")
+
+    def __init__(self, name, letterpot=None, help_points=1):
+        if letterpot is None:
+            letterpot = random_letterpot()
+        self.letterpot = letterpot
+        self.scores = pot_cache.get(letterpot)
+        self.player = Player(name, self.scores)
+        self._hints = None
+        self._help_points = help_points
+        self.tracker = SessionTracker(self.scores, self.player)
+        self.started_at = time()
+
+    @property
+    def hints(self):
+        if self._hints is None:
+            self._hints = HintEngine(self.letterpot, self.scores,
+                                     self._help_points,
+                                     self.player.guessed_words)
+        return self._hints
+
+    @property
+    def help_points(self):
+        if self._hints is None:
+            return self._help_points
+        return self._hints.help_points
+
+    def submit(self, word):
+        """Check and score one guess.
+
+        Args:
+            word (str): the player's guess.
+
+        Returns:
+            GuessResult: what happened to the guess.
+        """
+        return self.submit_many([word])[0]
+
+    def submit_many(self, words):
+        """Check and score a batch of guesses in one pass, in order. A word
+        that shows up twice counts as a duplicate the second time.
+
+        Args:
+            words (iterable of str): the player's guesses.
+
+        Returns:
+            list of GuessResult: one result per guess.
+        """
+        player = self.player
+        pot_words = lexicon.pot(self.letterpot)
+        word_type = lexicon.word_type
+        wordpoints = self.scores.wordpoints
+        possiblepoints = self.scores.possiblepoints
+        timed = metrics.enabled
+        results = []
+        for word in words:
+            if timed:
+                began = perf_counter()
+            word = word.lower()
+            if player.has_guessed(word):
+                result = GuessResult(word, "duplicate", None, 0,
+                                     player.score, possiblepoints)
+            else:
+                wordtype = word_type(word)
+                if len(word) < 4 or wordtype is None or word not in pot_words:
+                    player.guess_word(word)
+                    result = GuessResult(word, "invalid", None, 0,
+                                         player.score, possiblepoints)
+                else:
+                    # the tracker skips words the player already has, so
+                    # it counts the word before the player keeps it
+                    self.tracker.record(word)
+                    player.guess_word(word)
+                    points = wordpoints[word]
+                    player.add_score(points)
+                    if self._hints is not None:
+                        self._hints.guessed(word)
+                    result = GuessResult(word, "valid", wordtype, points,
+                                         player.score, possiblepoints)
+            results.append(result)
+            if timed:
+                GUESS_SECONDS.observe(perf_counter() - began)
+                GUESS_COUNTS[result.status].inc()
+        return results
+
+    def hint(self, strategy="letters"):
+        """Use up a hint point and return a hint (see HintEngine.hint()), or
+        None when the player is out of hints."""
+        if not metrics.enabled:
+            return self.hints.hint(strategy)
+        began = perf_counter()
+        hint = self.hints.hint(strategy)
+        if hint is not None:
+            HINT_SECONDS.observe(perf_counter() - began)
+        return hint
+
+    def report(self, n=5):
+        """Return the end of game numbers (see SessionTracker.report)."""
+        return self.tracker.report(n)
+
+    def fill_story(self, story):
+        """Return the story filled in with this player's words."""
+        return auto_fill_story(story, self.player, fillerpartofspeech)
+
+
+def get_word_types(word, partofspeech_dict):
+    """gets every part of speech of a word, since some words (like "calm")
+    are more than one
+    Args: 
+        word (str): word to look up
+        partofspeech_dict (dict): dictionary containing lists of valid input 
+                                  words sorted into parts of speech keys
+    Returns: 
+        frozenset: all part of speech keys the word is listed under
+    """
+    return lexicon_for(partofspeech_dict).pos_of(word)
     
-def play(story):
+def play(story, stream=False, letterpot=None, leaderboard=None):
     """
     plays game allowing user input, takes user name, explains rules, checks
     input word validity, gives score per input word, allows hint command,
@@ -474,6 +1368,10 @@ def play(story):
     
     Args:
         story (str): path to a text file containing a story
+        stream (bool): write the story out piece by piece with stream_story()
+            instead of building it in memory first
+        letterpot (str): letterpot to play, a random one if not given
+        leaderboard (Leaderboard): where to save the result, if anywhere
     
     
     Side effects:
@@ -485,63 +1383,43 @@ def play(story):
     
     print("Ready to play our Spelling Bee MadLibs Fusion game?!\n")
     name = input("Player name:  ")
-    player = Player(name)
     
-    # Try to make gamepot random?
-    game_pot = random.choice(list(letterpots.keys()))
+    # GameSession picks a random letterpot and does all of the scoring
+    session = GameSession(name, letterpot)
+    player = session.player
+    game_pot = session.letterpot
     print(f"Okay, {name}... your letters are \"{game_pot}\"\n")
     print("You can only use each letter once per word and your input words must be at least 4 letters long.\n")
     print("They've also got to be real words in the English dictionary-- I'll be checking.\n")
     print("One word per guess. Type 'HELP' for a hint (just 1 per game). Type 'DONE' when you're out.\n\n")
     
-    letterpoints, lettercount = totalpoints(game_pot)
-    help_points = 3
-    
-    # second instance of guessed_words, this time a "global variable idk how to access from class"
     while True:
         userinput = input("Give me a word (or HELP or DONE):  ").lower()
         if userinput == "done":
             break
-        # testing to see if help function works
         elif userinput == "help":
-            help_points -= 1 
-            if help_points > 1:     
-            # utilize help function only if enough help points are available
-                help(game_pot)
-               #print(f"You have {help_points} hints left")
-            else:
-                print("You have used up all your hints")
-        
-        elif userinput in player.guessed_words:
-            print("You've already guessed that.")
-        
+            hint = session.hint()
+            print(hint if hint is not None else "You have used up all your hints")
         else:
-            player.guessed_words.append(userinput)
-            
-            wordtype = get_word_type(userinput, partofspeech_dict)
-            ####want to change so i don't need this if statement below, this shouldn't be necessisary 
-            if wordtype is None:
-                print("Invalid word!")
-                continue
-            # modifier = "" ##### no suffix, maybe make that optional in the whole code
-            points = inputpoints(userinput, game_pot, wordtype)
-            if points == "Invalid word!":
-                 print("Invalid word!")
-            else:
-                earnedpoints, possiblepoints = points
-                player.add_score(earnedpoints)
-                print(f"You've found {player.score} out of {possiblepoints} possible.")
+            print(session.submit(userinput).message)
             
             
     print("Ready for your story ◡̈\n") #repeats the same noun for multiple blanks, doesn't catch "plural noun"
     print("Here it is:\n")
-    missed_words(game_pot, player)
+    missed_words(game_pot, player, session.tracker)
     #print("FOR TESTING PURPOSES:\n")
     #print(player.pos_guess(partofspeech_dict))
     # auto_fill_story is what fills in the story, DO REGEX STUFF IN AUTOFILLSTORY
     
     # STORY IS NOT INPUTTED
-    print(auto_fill_story(story, player, fillerpartofspeech))
+    if leaderboard is not None:
+        leaderboard.record_session(session)
+    if stream:
+        for piece in stream_story(story, player, fillerpartofspeech):
+            sys.stdout.write(piece)
+        print()
+    else:
+        print(auto_fill_story(story, player, fillerpartofspeech))
                 
     
 def parse_args(arglist):
@@ -550,7 +1428,16 @@ def parse_args(arglist):
     Expect one mandatory arguments:
         - story: a path to a file containing a fill-in-the-blank story
         
-    
+    Optional arguments:
+        - --stream: write the story out in pieces (see stream_story())
+        - --lexicon: a compiled lexicon file to play from (see binlexicon.py)
+        - --metrics: record metrics and write them to this file at the end
+        - --profile: run the game under cProfile and write stats to this file
+        - --atlas/--difficulty: pick the letterpot from a difficulty band of
+          an atlas built with potatlas.py
+        - --db: save the result to this SQLite leaderboard
+        - --filler: load filler words from a file or directory (see
+          fillerpool.py)
     
     Args:
         arglist (list of str): arguments from the command line.
@@ -562,8 +1449,55 @@ def parse_args(arglist):
     parser = ArgumentParser()
     parser.add_argument("story", help="Path to the TXT file"
                             "containing story")
+    parser.add_argument("--stream", action="store_true",
+                        help="Write the story out as it is filled in, for "
+                        "very large story files")
+    parser.add_argument("--lexicon", help="Path to a lexicon file built "
+                        "with binlexicon.py")
+    parser.add_argument("--metrics", help="Record metrics and write them "
+                        "here when the game ends (.json for JSON, anything "
+                        "else for Prometheus text)")
+    parser.add_argument("--profile", help="Run the game under cProfile and "
+                        "write the stats to this file")
+    parser.add_argument("--atlas", help="Path to a pot atlas built with "
+                        "potatlas.py")
+    parser.add_argument("--difficulty", default="medium",
+                        choices=["easy", "medium", "hard"],
+                        help="Difficulty band to pick the pot from (needs "
+                        "--atlas)")
+    parser.add_argument("--db", help="Path to a SQLite leaderboard to save "
+                        "the result in")
+    parser.add_argument("--filler", help="File or directory of filler words "
+                        "for blanks the player's words cannot fill")
     return parser.parse_args(arglist)
 
 if __name__ == "__main__":
     args = parse_args(sys.argv[1:])
-    play(args.story)
+    if args.lexicon:
+        load_lexicon(args.lexicon)
+    if args.filler:
+        load_filler(args.filler)
+    if args.metrics:
+        metrics.enabled = True
+    letterpot = None
+    if args.atlas:
+        from potatlas import choose_pot
+        letterpot, words = choose_pot(args.atlas, args.difficulty)
+        if letterpot is None:
+            sys.exit(f"{args.atlas} has no {args.difficulty} pots")
+        if words is not None:
+            add_letterpot(letterpot, words)
+    leaderboard = None
+    if args.db:
+        from leaderboard import Leaderboard
+        leaderboard = Leaderboard(args.db)
+    if args.profile:
+        import cProfile
+        cProfile.run("play(args.story, args.stream, letterpot, leaderboard)",
+                     args.profile)
+    else:
+        play(args.story, args.stream, letterpot, leaderboard)
+    if leaderboard is not None:
+        leaderboard.close()
+    if args.metrics:
+        metrics.dump(args.metrics)
@@ -0,0 +1,341 @@
+"""
+Simulated-player load test for the Spelling Bee MadLibs game.
+
+Plays thousands of games with bots instead of people typing into input().
+Each bot follows a profile: how skilled it is (how often its real words are
+high scorers), how many guesses it makes in a game, what share of its guesses
+are junk or repeats, and how often it asks for a hint. A game goes through
+the same steps as play(): GameSession guesses and hints, the missed words
+report and auto_fill_story() for the story at the end.
+
+Games are cut into shards that run on a process pool. Every game is seeded
+from the run seed and the game number, so a seed always plays the same games
+whatever the number of workers, and the outcome checksum can be compared
+between versions. The report gives games/s, guesses/s and latency
+percentiles for guesses, hints, the missed words report, the story and whole
+games.
+
+Example Run Code:
+python3 loadtest.py samplestory.txt --games 10000 --seed 7
+python3 loadtest.py samplestory.txt --mix novice=1,expert=3 --json run.json
+"""
+
+import hashlib
+import json
+import math
+import random
+import sys
+import time
+from argparse import ArgumentParser
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import letterpotpoints
+
+OPERATIONS = ("guess", "hint", "missed", "story", "game")
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class BotProfile:
+    """
+    How one kind of bot plays.
+    Attributes:
+        skill (float): chance a real-word guess is one of the pot's best
+            third of words rather than any word in the pot.
+        guesses (float): average number of guesses in a game.
+        spread (float): how much the number of guesses varies (the sigma of
+            a log-normal around guesses).
+        invalid_share (float): share of guesses that are made up.
+        duplicate_share (float): share of guesses that repeat an earlier one.
+        hint_rate (float): chance of asking for a hint on each turn.
+    """
+    def __init__(self, skill, guesses, spread=0.5, invalid_share=0.2,
+                 duplicate_share=0.05, hint_rate=0.02):
+        self.skill = skill
+        self.guesses = guesses
+        self.spread = spread
+        self.invalid_share = invalid_share
+        self.duplicate_share = duplicate_share
+        self.hint_rate = hint_rate
+
+    def guess_count(self, rng):
+        """Draw how many guesses a game gets, at least 1."""
+        mu = math.log(self.guesses) - self.spread ** 2 / 2
+        return max(1, round(rng.lognormvariate(mu, self.spread)))
+
+
+PROFILES = {
+    "novice": BotProfile(skill=0.1, guesses=8, invalid_share=0.45,
+                         duplicate_share=0.1, hint_rate=0.1),
+    "casual": BotProfile(skill=0.4, guesses=15, invalid_share=0.25,
+                         duplicate_share=0.05, hint_rate=0.03),
+    "expert": BotProfile(skill=0.9, guesses=40, invalid_share=0.05,
+                         duplicate_share=0.01, hint_rate=0.0),
+}
+
+
+def parse_mix(text):
+    """Turn "novice=1,expert=3" into {"novice": 1.0, "expert": 3.0}."""
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name not in PROFILES:
+            raise ValueError(f"unknown bot profile {name!r}")
+        mix[name] = float(weight) if weight else 1.0
+    return mix
+
+
+def junk_word(letterpot, rng):
+    """Make a guess from the pot's letters that is almost never a word."""
+    length = rng.randint(2, 8)
+    return "".join(rng.choice(letterpot) for _ in range(length))
+
+
+def fresh_word(decks, seen):
+    """Deal the next word the bot has not tried from the first deck that
+    still has one.
+
+    Args:
+        decks (list of list): shuffled word lists, dealt from the end.
+        seen (set): words the bot has already guessed.
+
+    Returns:
+        str: the word, or None once every deck is used up.
+    """
+    for deck in decks:
+        while deck:
+            word = deck.pop()
+            if word not in seen:
+                return word
+    return None
+
+
+def play_bot(game_id, story, profile, rng, timings, filler):
+    """Play one game as a bot.
+
+    Args:
+        game_id (int): the game's number, used for the player's name.
+        story (str): path to the story template.
+        profile (BotProfile): how the bot plays.
+        rng (random.Random): the game's random number generator.
+        timings (dict): operation -> array of seconds, appended to.
+        filler (dict): part of speech -> filler words.
+
+    Returns:
+        dict: counts for the game (guesses by status, hints) and its score
+        and story, for the checksum.
+    """
+    began = time.perf_counter()
+    session = letterpotpoints.GameSession(
+        f"bot{game_id}", letterpotpoints.random_letterpot(rng))
+    pot = session.letterpot
+    words = letterpotpoints.letterpots[pot]
+    best = session.scores.playable[:max(1, len(session.scores.playable) // 3)]
+    # real words are dealt from shuffled decks without replacement, so only
+    # the duplicate_share roll repeats a guess
+    best_deck = rng.sample(best, len(best))
+    word_deck = rng.sample(words, len(words))
+    counts = dict.fromkeys(("valid", "invalid", "duplicate"), 0)
+    counts["hints"] = 0
+    tried = []
+    seen = set()
+    for _ in range(profile.guess_count(rng)):
+        if rng.random() < profile.hint_rate:
+            started = time.perf_counter()
+            hint = session.hint()
+            timings["hint"].append(time.perf_counter() - started)
+            if hint is not None:
+                counts["hints"] += 1
+        roll = rng.random()
+        word = None
+        if tried and roll < profile.duplicate_share:
+            word = rng.choice(tried)
+        elif roll >= profile.duplicate_share + profile.invalid_share:
+            if rng.random() < profile.skill:
+                word = fresh_word((best_deck, word_deck), seen)
+            else:
+                word = fresh_word((word_deck, best_deck), seen)
+        if word is None:
+            # a junk roll, or the pot has no untried words left
+            word = junk_word(pot, rng)
+        tried.append(word)
+        seen.add(word)
+        started = time.perf_counter()
+        result = session.submit(word)
+        timings["guess"].append(time.perf_counter() - started)
+        counts[result.status] += 1
+
+    started = time.perf_counter()
+    letterpotpoints.missed_summary(pot, session.player, session.tracker)
+    timings["missed"].append(time.perf_counter() - started)
+    started = time.perf_counter()
+    text = letterpotpoints.auto_fill_story(story, session.player, filler)
+    timings["story"].append(time.perf_counter() - started)
+    timings["game"].append(time.perf_counter() - began)
+    counts["score"] = session.player.score
+    counts["story"] = text
+    return counts
+
+
+def _init_worker(lexicon, filler):
+    if lexicon:
+        letterpotpoints.load_lexicon(lexicon)
+    if filler:
+        letterpotpoints.load_filler(filler)
+
+
+def run_shard(start, count, story, seed, mix):
+    """Play one shard of games.
+
+    Args:
+        start (int): number of the first game.
+        count (int): number of games.
+        story (str): path to the story template.
+        seed (int): seed for the whole run.
+        mix (dict): profile name -> weight.
+
+    Returns:
+        tuple: (counts, timings, checksums). timings maps each operation to
+        an array of seconds; checksums holds an 8 byte hash of each game's
+        outcome, in game order.
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    timings = {operation: array("d") for operation in OPERATIONS}
+    totals = dict.fromkeys(("games", "valid", "invalid", "duplicate",
+                            "hints"), 0)
+    checksums = bytearray()
+    filler = letterpotpoints.fillerpartofspeech
+    for game_id in range(start, start + count):
+        rng = random.Random(f"{seed}-{game_id}")
+        # hints and stories use the module's random, so seed it too
+        random.seed(f"{seed}-{game_id}-game")
+        profile = PROFILES[rng.choices(names, weights)[0]]
+        outcome = play_bot(game_id, story, profile, rng, timings, filler)
+        totals["games"] += 1
+        for key in ("valid", "invalid", "duplicate", "hints"):
+            totals[key] += outcome[key]
+        digest = hashlib.sha256(f"{game_id}:{outcome['score']}:".encode())
+        digest.update(outcome["story"].encode())
+        checksums += digest.digest()[:8]
+    return totals, timings, bytes(checksums)
+
+
+def percentile(ordered, p):
+    """Return the p-th percentile (0-100) of a sorted sequence."""
+    if not ordered:
+        return 0.0
+    rank = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def run(story, games, seed=0, mix=None, workers=None, shard_size=500,
+        lexicon=None, filler=None):
+    """Play games bot games across a process pool.
+
+    Args:
+        story (str): path to the story template.
+        games (int): number of games to play.
+        seed (int): seed for the run; the same seed plays the same games.
+        mix (dict): profile name -> weight, every profile equally if not
+            given.
+        workers (int): processes to use, all cores if not given.
+        shard_size (int): games per task.
+        lexicon (str): compiled lexicon file for the workers to load.
+        filler (str): filler word file or directory for the workers to load.
+
+    Returns:
+        dict: the report (see the module docstring).
+    """
+    if mix is None:
+        mix = dict.fromkeys(PROFILES, 1.0)
+    totals = dict.fromkeys(("games", "valid", "invalid", "duplicate",
+                            "hints"), 0)
+    timings = {operation: array("d") for operation in OPERATIONS}
+    digest = hashlib.sha256()
+    began = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(lexicon, filler)) as pool:
+        futures = [pool.submit(run_shard, start, min(shard_size, games - start),
+                               story, seed, mix)
+                   for start in range(0, games, shard_size)]
+        for future in futures:
+            shard_totals, shard_timings, checksum = future.result()
+            for key, value in shard_totals.items():
+                totals[key] += value
+            for operation, seconds in shard_timings.items():
+                timings[operation].extend(seconds)
+            # per game hashes in game order, so sharding does not matter
+            digest.update(checksum)
+    elapsed = time.perf_counter() - began
+
+    guesses = totals["valid"] + totals["invalid"] + totals["duplicate"]
+    latency = {}
+    for operation in OPERATIONS:
+        ordered = sorted(timings[operation])
+        latency[operation] = {f"p{p:g}": percentile(ordered, p)
+                              for p in PERCENTILES}
+        latency[operation]["max"] = ordered[-1] if ordered else 0.0
+        latency[operation]["count"] = len(ordered)
+    return {"seed": seed, "mix": mix, "seconds": elapsed,
+            "games_per_sec": totals["games"] / elapsed,
+            "guesses_per_sec": guesses / elapsed, "totals": totals,
+            "latency": latency, "checksum": digest.hexdigest()}
+
+
+def format_report(report):
+    """Turn a run() report into a table for the terminal."""
+    totals = report["totals"]
+    lines = [f"{totals['games']} games in {report['seconds']:.2f}s: "
+             f"{report['games_per_sec']:,.0f} games/s, "
+             f"{report['guesses_per_sec']:,.0f} guesses/s",
+             f"guesses: {totals['valid']} valid, {totals['invalid']} invalid, "
+             f"{totals['duplicate']} duplicate; {totals['hints']} hints",
+             f"checksum {report['checksum'][:16]}",
+             f"{'latency (us)':12}" + "".join(f"{name:>10}" for name in
+                                              list(report["latency"]["game"])[:-1])]
+    for operation, stats in report["latency"].items():
+        lines.append(f"{operation:12}" + "".join(
+            f"{stats[name] * 1e6:>10.1f}" for name in list(stats)[:-1]))
+    return "\n".join(lines)
+
+
+def parse_args(arglist):
+    """ Parse command-line arguments.
+
+    Expect one mandatory argument:
+        - story: a path to a file containing a fill-in-the-blank story
+
+    Args:
+        arglist (list of str): arguments from the command line.
+
+    Returns:
+        namespace: the parsed arguments, as a namespace.
+    """
+    parser = ArgumentParser()
+    parser.add_argument("story", help="Path to the TXT file containing story")
+    parser.add_argument("-n", "--games", type=int, default=1000,
+                        help="Number of games to play")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the run")
+    parser.add_argument("--mix", type=parse_mix,
+                        help="Bot profiles and weights, e.g. novice=1,expert=3 "
+                        f"(profiles: {', '.join(PROFILES)})")
+    parser.add_argument("--workers", type=int,
+                        help="Processes to use (default: all cores)")
+    parser.add_argument("--shard-size", type=int, default=500,
+                        help="Games per task")
+    parser.add_argument("--lexicon", help="Path to a lexicon file built "
+                        "with binlexicon.py")
+    parser.add_argument("--filler", help="File or directory of filler words")
+    parser.add_argument("--json", help="Also write the report to this file")
+    return parser.parse_args(arglist)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    report = run(args.story, args.games, args.seed, args.mix, args.workers,
+                 args.shard_size, args.lexicon, args.filler)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
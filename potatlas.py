@@ -0,0 +1,382 @@
+"""
+Letterpot difficulty atlas for the Spelling Bee MadLibs game.
+
+An offline job that looks at every candidate 7-letter pot in a dictionary
+(or the built in letterpots), works out how many words it has, how many of
+them have a part of speech, how its word scores are spread (using the same
+scoring as totalpoints()) and the most points a player could get. The
+candidates are split into chunks that run on every core. Each finished chunk
+is saved as a checkpoint, so an interrupted run picks up where it left off.
+
+The result is a file of fixed-size records sorted by difficulty, followed by
+every pot's word list. The game opens it with mmap and finds the pots in a
+difficulty band with a binary search, then reads only the chosen pot's
+words, so picking a pot is O(log n) however big the atlas or the dictionary
+it came from is.
+
+Difficulty is 1 - playable / (playable + 50), where playable counts the
+words that have a part of speech (the only ones a player can score): pots
+with lots of them are easy (close to 0) and pots with only a few are hard
+(close to 1). Pots with no playable words are left out. The part of speech
+table is the built in one unless --lexicon gives a compiled lexicon, which
+every worker loads.
+
+Example Run Code:
+python3 potatlas.py atlas.bin --dictionary /usr/share/dict/words --lexicon lexicon.bin
+python3 letterpotpoints.py samplestory.txt --atlas atlas.bin --difficulty hard
+"""
+
+import bisect
+import json
+import mmap
+import os
+import random
+import shutil
+import struct
+import sys
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+
+import letterpotpoints
+import potgen
+
+MAGIC = b"MLBATL\x00\x02"
+# magic, record count, metadata size, offset of the word lists
+HEADER = struct.Struct("<8sIIQ")
+MAX_POS = 8
+# difficulty, key, words, playable words, possible points, min/mean/max
+# word score, words per part of speech, then where the pot's word list
+# (newline separated UTF-8) starts and how many bytes it takes
+RECORD = struct.Struct(f"<d8sIIdddd{MAX_POS}IQI")
+BANDS = {"easy": (0.0, 0.4), "medium": (0.4, 0.7), "hard": (0.7, 1.0)}
+CHUNK_SIZE = 500
+
+_index = None
+
+
+def difficulty(playable):
+    """Turn a pot's number of playable words into a difficulty between 0
+    and 1."""
+    return 1 - playable / (playable + 50)
+
+
+def _init_worker(dictionary, lexicon=None):
+    """Load the dictionary (and the lexicon, if any) once per worker
+    process."""
+    global _index
+    if lexicon is not None:
+        letterpotpoints.load_lexicon(lexicon)
+    if dictionary is None:
+        _index = None
+    else:
+        _index = potgen.index_words(potgen.read_words(dictionary))
+
+
+def pot_stats(key, words):
+    """Work out the atlas entry for one pot.
+
+    Args:
+        key (str): the pot's letters.
+        words (list of str): every word the pot can make.
+
+    Returns:
+        dict: the pot's statistics.
+    """
+    lexicon = letterpotpoints.lexicon
+    pos_counts = [0] * len(lexicon.pos_order)
+    playable = 0
+    for word in words:
+        types = lexicon.pos_of(word)
+        if types:
+            playable += 1
+        for i, pos in enumerate(lexicon.pos_order):
+            if pos in types:
+                pos_counts[i] += 1
+    scores = letterpotpoints.PotScores(key, words)
+    points = list(scores.wordpoints.values())
+    return {"key": key, "difficulty": difficulty(playable),
+            "words": len(words), "playable": playable,
+            "possiblepoints": scores.possiblepoints,
+            "min": min(points), "mean": sum(points) / len(points),
+            "max": max(points), "pos": pos_counts}
+
+
+def atlas_chunk(chunk_id, keys, checkpoints):
+    """Compute one chunk of the atlas and save it as a checkpoint.
+
+    Args:
+        chunk_id (int): the chunk's number.
+        keys (list of str): pots in the chunk.
+        checkpoints (str): directory for checkpoint files.
+
+    Returns:
+        int: number of pots in the chunk, including the ones left out for
+        having no playable words.
+    """
+    entries = []
+    for key in keys:
+        if _index is None:
+            words = letterpotpoints.letterpots[key]
+        else:
+            words = potgen.spell(_index, potgen.letter_mask(key))
+        if not words:
+            continue
+        entry = pot_stats(key, words)
+        # a pot the player cannot score a single word in is no game
+        if entry["playable"]:
+            entry["wordlist"] = list(words)
+            entries.append(entry)
+    path = os.path.join(checkpoints, f"chunk-{chunk_id:06d}.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(entries, f)
+    os.replace(path + ".tmp", path)
+    return len(keys)
+
+
+def candidate_keys(dictionary):
+    """List every candidate pot, from the dictionary or the built in data."""
+    if dictionary is None:
+        return sorted(letterpotpoints.letterpots)
+    index = potgen.index_words(potgen.read_words(dictionary))
+    return [potgen.mask_letters(mask) for mask in potgen.pangram_masks(index)]
+
+
+def build_atlas(path, dictionary=None, checkpoints=None, workers=None,
+                chunk_size=CHUNK_SIZE, lexicon=None):
+    """Run the whole job and write the atlas file.
+
+    Args:
+        path (str): where to write the atlas.
+        dictionary (str): word file to take pots from. The built in
+            letterpots are used if not given.
+        checkpoints (str): directory for checkpoints, path + ".ckpt" if not
+            given. Chunks already saved there are not computed again. It is
+            removed once the atlas has been written.
+        workers (int): processes to use, all cores if not given.
+        chunk_size (int): pots per chunk.
+        lexicon (str): compiled lexicon file (see binlexicon.py) whose
+            parts of speech decide which words are playable. The game's
+            current lexicon is used if not given.
+
+    Returns:
+        int: number of pots in the atlas.
+    """
+    if checkpoints is None:
+        checkpoints = path + ".ckpt"
+    if dictionary is not None:
+        dictionary = os.path.abspath(dictionary)
+    if lexicon is not None:
+        lexicon = os.path.abspath(lexicon)
+        letterpotpoints.load_lexicon(lexicon)
+    keys = candidate_keys(dictionary)
+    chunks = [keys[i:i + chunk_size] for i in range(0, len(keys), chunk_size)]
+
+    # checkpoints only count if they were made for this exact job
+    job = {"dictionary": dictionary, "lexicon": lexicon,
+           "chunk_size": chunk_size, "candidates": len(keys),
+           "format": MAGIC[-1]}
+    manifest = os.path.join(checkpoints, "job.json")
+    if os.path.exists(manifest):
+        with open(manifest) as f:
+            if json.load(f) != job:
+                shutil.rmtree(checkpoints)
+    os.makedirs(checkpoints, exist_ok=True)
+    with open(manifest, "w") as f:
+        json.dump(job, f)
+    todo = [i for i in range(len(chunks)) if not os.path.exists(
+        os.path.join(checkpoints, f"chunk-{i:06d}.json"))]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(dictionary, lexicon)) as pool:
+        futures = [pool.submit(atlas_chunk, i, chunks[i], checkpoints)
+                   for i in todo]
+        for future in futures:
+            future.result()
+
+    entries = []
+    for i in range(len(chunks)):
+        with open(os.path.join(checkpoints, f"chunk-{i:06d}.json")) as f:
+            entries.extend(json.load(f))
+    write_atlas(path, entries, dictionary)
+    shutil.rmtree(checkpoints)
+    return len(entries)
+
+
+def write_atlas(path, entries, dictionary=None):
+    """Sort atlas entries by difficulty and write them as fixed-size records.
+
+    Args:
+        path (str): where to write the atlas.
+        entries (list of dict): output of pot_stats(), each with the pot's
+            words under "wordlist".
+        dictionary (str): the word file the pots came from, kept for
+            reference.
+    """
+    pos_order = list(letterpotpoints.lexicon.pos_order)[:MAX_POS]
+    if dictionary is not None:
+        dictionary = os.path.abspath(dictionary)
+    meta = json.dumps({"pos": pos_order, "dictionary": dictionary}).encode()
+    entries = sorted(entries, key=lambda entry: (entry["difficulty"], entry["key"]))
+    start = HEADER.size + len(meta)
+    start += -start % 8
+    words_at = start + len(entries) * RECORD.size
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(entries), len(meta), words_at))
+        f.write(meta)
+        f.write(b"\x00" * (start - HEADER.size - len(meta)))
+        blobs = []
+        offset = 0
+        for entry in entries:
+            blob = "\n".join(entry["wordlist"]).encode("utf-8")
+            blobs.append(blob)
+            pos = (entry["pos"] + [0] * MAX_POS)[:MAX_POS]
+            f.write(RECORD.pack(entry["difficulty"], entry["key"].encode(),
+                                entry["words"], entry["playable"],
+                                entry["possiblepoints"], entry["min"],
+                                entry["mean"], entry["max"], *pos,
+                                offset, len(blob)))
+            offset += len(blob)
+        for blob in blobs:
+            f.write(blob)
+
+
+class _Difficulties:
+    """Lets bisect search the records' difficulty without reading them all."""
+    def __init__(self, atlas):
+        self._atlas = atlas
+
+    def __getitem__(self, i):
+        return struct.unpack_from("<d", self._atlas._buffer,
+                                  self._atlas._start + i * RECORD.size)[0]
+
+    def __len__(self):
+        return len(self._atlas)
+
+
+class Atlas:
+    """
+    An atlas file opened with mmap.
+    Attributes:
+        pos_order (list): part of speech names for the per-pos counts.
+        dictionary (str): the word file the pots came from, or None.
+    """
+    def __init__(self, buffer):
+        self._buffer = buffer
+        magic, self._count, meta_size, self._words_at = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError("not a MadLibsBee atlas file")
+        meta = json.loads(bytes(buffer[HEADER.size:HEADER.size + meta_size]))
+        self.pos_order = meta["pos"]
+        self.dictionary = meta["dictionary"]
+        self._start = HEADER.size + meta_size
+        self._start += -self._start % 8
+        self._difficulties = _Difficulties(self)
+
+    @classmethod
+    def open(cls, path):
+        """Open an atlas file with mmap."""
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        fields = RECORD.unpack_from(self._buffer, self._start + i * RECORD.size)
+        pos = dict(zip(self.pos_order, fields[8:8 + MAX_POS]))
+        return {"index": i, "difficulty": fields[0],
+                "key": fields[1].rstrip(b"\x00").decode(),
+                "words": fields[2], "playable": fields[3],
+                "possiblepoints": fields[4], "min": fields[5],
+                "mean": fields[6], "max": fields[7], "pos": pos}
+
+    def pot_words(self, i):
+        """Return the word list of the i-th pot, reading only its bytes."""
+        offset, size = struct.unpack_from(
+            "<QI", self._buffer, self._start + i * RECORD.size + RECORD.size - 12)
+        start = self._words_at + offset
+        blob = bytes(self._buffer[start:start + size]).decode("utf-8")
+        return blob.split("\n") if blob else []
+
+    def band(self, low, high):
+        """Return the (start, stop) record range with low <= difficulty <
+        high, found by binary search."""
+        start = bisect.bisect_left(self._difficulties, low)
+        stop = bisect.bisect_left(self._difficulties, high, start)
+        return start, stop
+
+    def pick(self, band="medium", rng=random):
+        """Pick a random pot in a difficulty band.
+
+        Args:
+            band (str): "easy", "medium" or "hard".
+            rng: random number generator to use.
+
+        Returns:
+            dict: the atlas entry, or None if the band is empty.
+        """
+        start, stop = self.band(*BANDS[band])
+        if start >= stop:
+            return None
+        return self[rng.randrange(start, stop)]
+
+
+def choose_pot(path, band="medium", rng=random):
+    """Pick a pot for a game from an atlas file.
+
+    Args:
+        path (str): the atlas file.
+        band (str): "easy", "medium" or "hard".
+        rng: random number generator to use.
+
+    Returns:
+        tuple: (key, words). words is None for a pot the game already has;
+        otherwise it is the pot's word list from the atlas, to pass to
+        add_letterpot(). Returns (None, None) if the band is empty.
+    """
+    atlas = Atlas.open(path)
+    entry = atlas.pick(band, rng)
+    if entry is None:
+        return None, None
+    key = entry["key"]
+    if key in letterpotpoints.letterpots:
+        return key, None
+    return key, atlas.pot_words(entry["index"])
+
+
+def parse_args(arglist):
+    """ Parse command-line arguments.
+
+    Expect one mandatory argument:
+        - output: where to write the atlas file
+
+    Args:
+        arglist (list of str): arguments from the command line.
+
+    Returns:
+        namespace: the parsed arguments, as a namespace.
+    """
+    parser = ArgumentParser()
+    parser.add_argument("output", help="Path to write the atlas file to")
+    parser.add_argument("--dictionary", help="Word file to take candidate "
+                        "pots from (default: the built in letterpots)")
+    parser.add_argument("--checkpoints", help="Checkpoint directory "
+                        "(default: OUTPUT.ckpt)")
+    parser.add_argument("--workers", type=int,
+                        help="Processes to use (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="Pots per checkpointed chunk")
+    parser.add_argument("--lexicon", help="Path to a lexicon file built "
+                        "with binlexicon.py, for the parts of speech")
+    return parser.parse_args(arglist)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    began = time.perf_counter()
+    count = build_atlas(args.output, args.dictionary, args.checkpoints,
+                        args.workers, args.chunk_size, args.lexicon)
+    print(f"{count} pots in {time.perf_counter() - began:.1f}s",
+          file=sys.stderr)
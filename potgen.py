@@ -0,0 +1,192 @@
+"""
+Letterpot generator for the Spelling Bee MadLibs game.
+
+Builds letterpots from any word list instead of copying them by hand from a
+website. Each word is stored as a 26-bit mask of the letters it uses, so
+checking whether a 7-letter pot can spell a word is a single subset test
+(word_mask & ~pot_mask == 0). Words are grouped by mask, which means spelling
+every word for a pot only needs a lookup for each of the pot's 127 submasks.
+
+The output has the same {key: [words]} shape as letterpots in
+letterpotpoints.py, so it works with totalpoints, isvalid and missed_words.
+
+Example Run Code:
+python3 potgen.py /usr/share/dict/words -o pots.json
+"""
+
+import json
+import sys
+import time
+from argparse import ArgumentParser
+
+POT_SIZE = 7
+MIN_LENGTH = 4
+
+
+def letter_mask(word):
+    """Turn a word into a 26-bit mask with one bit per letter it uses.
+
+    Args:
+        word (str): lowercase a-z word.
+
+    Returns:
+        int: the letter mask (bit 0 is 'a', bit 25 is 'z').
+    """
+    mask = 0
+    for letter in word:
+        mask |= 1 << (ord(letter) - 97)
+    return mask
+
+
+def mask_letters(mask):
+    """Turn a letter mask back into its sorted letters, e.g. 'aceilms'."""
+    return "".join(chr(97 + bit) for bit in range(26) if mask >> bit & 1)
+
+
+def read_words(path, min_length=MIN_LENGTH):
+    """Read a word file with one word per line.
+
+    Proper nouns (capitalized), words with apostrophes or other non a-z
+    characters, and words shorter than min_length are skipped.
+
+    Args:
+        path (str): path to the word file, e.g. /usr/share/dict/words.
+        min_length (int): shortest word to keep.
+
+    Returns:
+        list of str: the usable words, without duplicates.
+    """
+    words = set()
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            word = line.strip()
+            if (len(word) >= min_length and word.isascii() and word.isalpha()
+                    and word.islower()):
+                words.add(word)
+    return sorted(words)
+
+
+def index_words(words, repeats=False):
+    """Group words by their letter mask.
+
+    Args:
+        words (iterable of str): lowercase words.
+        repeats (bool): keep words that use a letter more than once. The game
+            only lets each letter be used once, so these are skipped by
+            default.
+
+    Returns:
+        dict: letter mask -> list of words with exactly those letters.
+    """
+    index = {}
+    for word in words:
+        mask = letter_mask(word)
+        if not repeats and mask.bit_count() != len(word):
+            continue
+        if mask.bit_count() > POT_SIZE:
+            continue
+        index.setdefault(mask, []).append(word)
+    return index
+
+
+def pangram_masks(index):
+    """Find every 7-letter pot that has at least one word using all 7 letters.
+
+    Args:
+        index (dict): output of index_words().
+
+    Returns:
+        list of int: letter masks of the pots, sorted by their letters.
+    """
+    masks = [mask for mask in index if mask.bit_count() == POT_SIZE]
+    return sorted(masks, key=mask_letters)
+
+
+def spell(index, pot_mask, min_length=MIN_LENGTH):
+    """List every word a pot can spell.
+
+    Args:
+        index (dict): output of index_words().
+        pot_mask (int): letter mask of the pot.
+        min_length (int): shortest word to include.
+
+    Returns:
+        list of str: the words, longest first, like the letterpots lists.
+    """
+    words = []
+    sub = pot_mask
+    while sub:
+        found = index.get(sub)
+        if found:
+            words.extend(word for word in found if len(word) >= min_length)
+        sub = (sub - 1) & pot_mask
+    words.sort(key=lambda word: (-len(word), word))
+    return words
+
+
+def generate_letterpots(words, keys=None, min_length=MIN_LENGTH,
+                        repeats=False):
+    """Build letterpots from a word list.
+
+    Args:
+        words (iterable of str): the dictionary to build from.
+        keys (list of str): pots to build, kept as given. If not given,
+            every pangram-backed 7-letter pot in the dictionary is built and
+            keyed by its sorted letters.
+        min_length (int): shortest word allowed in a pot.
+        repeats (bool): allow words that reuse a letter.
+
+    Returns:
+        dict: pot key (sorted letters) -> list of words, the same structure
+        as letterpots.
+    """
+    index = index_words(words, repeats)
+    if keys is None:
+        keys = [mask_letters(mask) for mask in pangram_masks(index)]
+    pots = {}
+    for key in keys:
+        found = spell(index, letter_mask(key), min_length)
+        if found:
+            pots[key] = found
+    return pots
+
+
+def parse_args(arglist):
+    """ Parse command-line arguments.
+
+    Expect one mandatory argument:
+        - words: a path to a word file with one word per line
+
+    Args:
+        arglist (list of str): arguments from the command line.
+
+    Returns:
+        namespace: the parsed arguments, as a namespace.
+    """
+    parser = ArgumentParser()
+    parser.add_argument("words", help="Path to a word list, one word per line")
+    parser.add_argument("-o", "--output", help="Write the pots to this JSON "
+                        "file instead of stdout")
+    parser.add_argument("--pot", action="append", dest="keys",
+                        help="Only build this pot (can be repeated)")
+    parser.add_argument("--min-length", type=int, default=MIN_LENGTH,
+                        help="Shortest word allowed in a pot")
+    parser.add_argument("--repeats", action="store_true",
+                        help="Allow words that use a letter more than once")
+    return parser.parse_args(arglist)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    start = time.perf_counter()
+    words = read_words(args.words, args.min_length)
+    pots = generate_letterpots(words, args.keys, args.min_length, args.repeats)
+    elapsed = time.perf_counter() - start
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(pots, f)
+    else:
+        json.dump(pots, sys.stdout)
+        print()
+    print(f"{len(pots)} pots from {len(words)} words in {elapsed:.2f}s",
+          file=sys.stderr)
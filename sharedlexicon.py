@@ -0,0 +1,188 @@
+"""
+Shared-memory lexicon for the Spelling Bee MadLibs game.
+
+When the game runs on a process pool or a pre-forking server, every worker
+that imports letterpotpoints.py gets its own letterpots, partofspeech_dict
+and indexes, and refcount updates soon copy any pages fork() shared. Here the
+parent packs the lexicon once (the binlexicon.py format) into a
+multiprocessing.shared_memory block. Workers attach to the block by name and
+read it through a BinaryLexicon over the shared buffer, without copying it.
+Guesses, parts of speech and pot words are then answered straight from the
+shared pages. The only per-worker state is the bounded score cache
+(pot_cache) for the pots a worker actually plays, so a worker's own memory
+stays about the same however many workers there are.
+
+Example:
+    with SharedLexicon.create() as shared:
+        with ProcessPoolExecutor(initializer=init_worker,
+                                 initargs=(shared.name,)) as pool:
+            ...
+
+Example Run Code:
+python3 sharedlexicon.py --lexicon lexicon.bin --workers 8
+"""
+
+import os
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import letterpotpoints
+from binlexicon import BinaryLexicon, pack_lexicon
+
+# blocks this process has attached to, kept so they stay mapped
+_attached = []
+
+
+class SharedLexicon:
+    """
+    A packed lexicon in a shared memory block, owned by the process that
+    made it. Closing it unlinks the block, so workers should be done first.
+    Attributes:
+        name (str): the block's name, for attach_lexicon().
+        size (int): bytes in the packed lexicon.
+    """
+    def __init__(self, data):
+        self.size = len(data)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, self.size))
+        self._shm.buf[:self.size] = data
+        self.name = self._shm.name
+
+    @classmethod
+    def create(cls, letterpots=None, partofspeech_dict=None, path=None):
+        """Pack a lexicon into shared memory.
+
+        Args:
+            letterpots (dict): letterpot key -> list of words, the game's
+                letterpots if not given.
+            partofspeech_dict (dict): part of speech -> list of words, the
+                game's partofspeech_dict if not given.
+            path (str): a lexicon file built with binlexicon.py to copy in
+                instead.
+
+        Returns:
+            SharedLexicon: the owner of the new block.
+        """
+        if path is not None:
+            with open(path, "rb") as f:
+                return cls(f.read())
+        if letterpots is None:
+            letterpots = letterpotpoints.letterpots
+        if partofspeech_dict is None:
+            partofspeech_dict = letterpotpoints.partofspeech_dict
+        return cls(pack_lexicon(letterpots, partofspeech_dict))
+
+    def close(self):
+        """Unmap and unlink the block."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _open_shared(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # before 3.13 attaching registers the block with the resource tracker
+    # as if this process owned it, and a worker with its own tracker would
+    # unlink it on exit; unregistering afterwards instead would drop the
+    # owner's entry when the tracker is shared, so skip registering
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def attach_lexicon(name):
+    """Attach to a shared lexicon without copying it.
+
+    Args:
+        name (str): SharedLexicon.name of the block.
+
+    Returns:
+        BinaryLexicon: the lexicon, reading from the shared pages.
+    """
+    shm = _open_shared(name)
+    _attached.append(shm)
+    return BinaryLexicon(shm.buf)
+
+
+def init_worker(name):
+    """Process pool initializer: play from the shared lexicon.
+
+    Args:
+        name (str): SharedLexicon.name of the block.
+    """
+    letterpotpoints.use_lexicon(attach_lexicon(name))
+
+
+def private_kb():
+    """Return this process's private (unshared) memory in KB, from
+    /proc/self/smaps_rollup, or None where that file does not exist."""
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    total = 0
+    for line in lines:
+        if line.startswith(("Private_Clean:", "Private_Dirty:")):
+            total += int(line.split()[1])
+    return total
+
+
+def _check_worker(pots):
+    """Look up every word of some pots and report this worker's memory."""
+    for key in pots:
+        for word in letterpotpoints.letterpots[key]:
+            wordtype = letterpotpoints.get_word_type(
+                word, letterpotpoints.partofspeech_dict)
+            try:
+                letterpotpoints.isvalid(key, word, wordtype)
+            except ValueError:
+                pass
+        letterpotpoints.pot_cache.get(key)
+    return os.getpid(), private_kb()
+
+
+def parse_args(arglist):
+    """ Parse command-line arguments.
+
+    Args:
+        arglist (list of str): arguments from the command line.
+
+    Returns:
+        namespace: the parsed arguments, as a namespace.
+    """
+    parser = ArgumentParser()
+    parser.add_argument("--lexicon", help="Lexicon file built with "
+                        "binlexicon.py (default: the built in words)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Worker processes to start")
+    parser.add_argument("--pots", type=int, default=100,
+                        help="Pots each worker looks through")
+    return parser.parse_args(arglist)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    with SharedLexicon.create(path=args.lexicon) as shared:
+        print(f"{shared.size / 1e6:.1f} MB lexicon in shared memory "
+              f"{shared.name}", file=sys.stderr)
+        keys = list(attach_lexicon(shared.name).keys())[:args.pots]
+        with ProcessPoolExecutor(max_workers=args.workers,
+                                 initializer=init_worker,
+                                 initargs=(shared.name,)) as pool:
+            results = list(pool.map(_check_worker,
+                                    [keys] * args.workers))
+        for pid, kb in results:
+            print(f"worker {pid}: {kb} KB private")
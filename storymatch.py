@@ -0,0 +1,239 @@
+"""
+Story and letterpot matching for the Spelling Bee MadLibs game.
+
+auto_fill_story() only finds out at the end of a game that the pot could not
+supply enough words for the story, and then filler words take over. This
+module works that out ahead of time:
+
+    demand of a story   distinct placeholders per part of speech (a
+                        placeholder used twice needs one word)
+    supply of a pot     the pot's playable words per part of speech
+
+The shortfall of a (story, pot) pair is how many placeholders the pot cannot
+possibly fill: the sum over parts of speech of max(0, demand - supply). A
+StoryMatcher keeps every story's demand and every pot's supply as rows of
+two matrices, so finding the best pots for a story (or the best stories for a
+pot) is one vectorized pass over thousands of rows. NumPy is optional; the
+plain Python fallback gives the same answers.
+
+Example Run Code:
+python3 storymatch.py samplestory.txt --story samplestory.txt
+python3 storymatch.py stories/*.txt --pot aceilms -k 5
+"""
+
+import heapq
+import sys
+from argparse import ArgumentParser
+
+import letterpotpoints
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAVE_NUMPY = np is not None
+
+
+def demand_vector(slots, pos_order):
+    """Count the distinct placeholders of each part of speech in a story.
+
+    Args:
+        slots (list of str): the story's placeholders, e.g. from
+            extract_placeholders() (repeats are fine).
+        pos_order (tuple): parts of speech, in vector order.
+
+    Returns:
+        list of int: placeholders per part of speech.
+    """
+    counts = dict.fromkeys(pos_order, 0)
+    for slot in set(slots):
+        match = letterpotpoints.POS_PLACEHOLDER.match(slot)
+        if match and match.group(1) in counts:
+            counts[match.group(1)] += 1
+    return [counts[pos] for pos in pos_order]
+
+
+def supply_vector(words, pos_order):
+    """Count a pot's playable words for each part of speech. A word with
+    two parts of speech counts for both.
+
+    Args:
+        words (iterable of str): the pot's words.
+        pos_order (tuple): parts of speech, in vector order.
+
+    Returns:
+        list of int: playable words per part of speech.
+    """
+    lexicon = letterpotpoints.lexicon
+    counts = dict.fromkeys(pos_order, 0)
+    for word in words:
+        if len(word) < 4:
+            continue
+        for pos in lexicon.pos_of(word):
+            if pos in counts:
+                counts[pos] += 1
+    return [counts[pos] for pos in pos_order]
+
+
+def shortfall(demand, supply):
+    """Return how many placeholders supply cannot fill."""
+    return sum(max(0, need - have) for need, have in zip(demand, supply))
+
+
+class StoryMatcher:
+    """
+    Demand vectors for stories and supply vectors for pots, matched by
+    shortfall. Ties go to the pot with more playable words, then by name.
+    Attributes:
+        pos_order (tuple): parts of speech, in vector order.
+        demand (dict): story name -> demand vector.
+        supply (dict): pot key -> supply vector.
+    """
+    def __init__(self, pos_order=None):
+        if pos_order is None:
+            pos_order = letterpotpoints.lexicon.pos_order
+        self.pos_order = tuple(pos_order)
+        self.demand = {}
+        self.supply = {}
+        self._arrays = None
+
+    @classmethod
+    def build(cls, stories, letterpots=None):
+        """Make a matcher for story files and letterpots.
+
+        Args:
+            stories (list of str): paths to story templates.
+            letterpots (mapping): letterpot key -> words, the game's
+                letterpots if not given.
+
+        Returns:
+            StoryMatcher: the matcher.
+        """
+        matcher = cls()
+        for path in stories:
+            matcher.add_story(path, letterpotpoints.compile_story(path).slots)
+        if letterpots is None:
+            letterpots = letterpotpoints.letterpots
+        for key in letterpots:
+            matcher.add_pot(key, letterpots[key])
+        return matcher
+
+    def add_story(self, name, slots):
+        """Add (or replace) a story by its placeholders."""
+        self.demand[name] = demand_vector(slots, self.pos_order)
+        self._arrays = None
+
+    def add_pot(self, key, words):
+        """Add (or replace) a pot by its words."""
+        self.supply[key] = supply_vector(words, self.pos_order)
+        self._arrays = None
+
+    def _matrices(self):
+        # the NumPy copies of the vectors are rebuilt after any change
+        if self._arrays is None:
+            stories = list(self.demand)
+            pots = list(self.supply)
+            width = len(self.pos_order)
+            self._arrays = (
+                stories, np.array([self.demand[name] for name in stories],
+                                  dtype=np.int64).reshape(-1, width),
+                pots, np.array([self.supply[key] for key in pots],
+                               dtype=np.int64).reshape(-1, width))
+        return self._arrays
+
+    def best_pots(self, story, k=10):
+        """Find the pots that leave the fewest placeholders to filler.
+
+        Args:
+            story (str): name the story was added under.
+            k (int): how many pots to return.
+
+        Returns:
+            list of tuple: (pot key, shortfall), best first.
+        """
+        demand = self.demand[story]
+        if not HAVE_NUMPY:
+            return [(key, missing) for missing, _, key in heapq.nsmallest(
+                k, ((shortfall(demand, supply), -sum(supply), key)
+                    for key, supply in self.supply.items()))]
+        _, _, pots, supply = self._matrices()
+        missing = np.maximum(np.array(demand) - supply, 0).sum(axis=1)
+        return self._top(pots, missing, supply.sum(axis=1), k)
+
+    def best_stories(self, pot, k=10):
+        """Find the stories a pot can fill best.
+
+        Args:
+            pot (str): key the pot was added under.
+            k (int): how many stories to return.
+
+        Returns:
+            list of tuple: (story name, shortfall), best first.
+        """
+        supply = self.supply[pot]
+        if not HAVE_NUMPY:
+            return [(name, missing) for missing, _, name in heapq.nsmallest(
+                k, ((shortfall(demand, supply), -sum(demand), name)
+                    for name, demand in self.demand.items()))]
+        stories, demand, _, _ = self._matrices()
+        missing = np.maximum(demand - np.array(supply), 0).sum(axis=1)
+        return self._top(stories, missing, demand.sum(axis=1), k)
+
+    @staticmethod
+    def _top(names, missing, size, k):
+        """Pick the k rows with the smallest shortfall, larger size first on
+        ties, then by name, the same order as the Python fallback."""
+        k = min(k, len(names))
+        if k <= 0:
+            return []
+        if k < len(names):
+            # everything tied with the k-th best shortfall stays in the
+            # running, so the tie-break below sees all of them
+            cutoff = np.partition(missing, k - 1)[k - 1]
+            rows = np.flatnonzero(missing <= cutoff)
+        else:
+            rows = np.arange(len(names))
+        rows = sorted(rows.tolist(),
+                      key=lambda row: (missing[row], -size[row], names[row]))
+        return [(names[row], int(missing[row])) for row in rows[:k]]
+
+
+def parse_args(arglist):
+    """ Parse command-line arguments.
+
+    Expect one or more mandatory arguments:
+        - stories: paths to files containing fill-in-the-blank stories
+
+    Args:
+        arglist (list of str): arguments from the command line.
+
+    Returns:
+        namespace: the parsed arguments, as a namespace.
+    """
+    parser = ArgumentParser()
+    parser.add_argument("stories", nargs="+",
+                        help="Paths to the TXT files containing stories")
+    parser.add_argument("--story", help="List the best pots for this story")
+    parser.add_argument("--pot", help="List the best stories for this pot")
+    parser.add_argument("-k", type=int, default=10,
+                        help="How many matches to list")
+    parser.add_argument("--lexicon", help="Path to a lexicon file built "
+                        "with binlexicon.py")
+    return parser.parse_args(arglist)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    if args.lexicon:
+        letterpotpoints.load_lexicon(args.lexicon)
+    stories = list(args.stories)
+    if args.story and args.story not in stories:
+        stories.append(args.story)
+    matcher = StoryMatcher.build(stories)
+    if args.story:
+        for key, missing in matcher.best_pots(args.story, args.k):
+            print(f"{key}\t{missing} short")
+    if args.pot:
+        for name, missing in matcher.best_stories(args.pot, args.k):
+            print(f"{name}\t{missing} short")
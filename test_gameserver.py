@@ -0,0 +1,124 @@
+"""
+Tests for gameserver.py, played against a real server on localhost.
+
+Example Run Code:
+python3 -m unittest test_gameserver
+"""
+
+import asyncio
+import unittest
+
+import letterpotpoints
+from gameserver import GameServer
+
+STORY = "samplestory.txt"
+
+
+class GameServerTest(unittest.IsolatedAsyncioTestCase):
+    async def start(self, **options):
+        """Start a server on a free port and return it."""
+        self.game_server = GameServer(STORY, **options)
+        self.server = await self.game_server.start("127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.game_server
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def connect(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        self.addAsyncCleanup(self.disconnect, writer)
+        return reader, writer
+
+    async def disconnect(self, writer):
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def ask(self, reader, writer, line):
+        writer.write(line.encode() + b"\n")
+        await writer.drain()
+        return await self.reply(reader)
+
+    async def reply(self, reader):
+        line = await asyncio.wait_for(reader.readline(), 5)
+        return line.decode().rstrip("\n")
+
+    async def test_game(self):
+        await self.start()
+        reader, writer = await self.connect()
+        greeting = await self.reply(reader)
+        self.assertTrue(greeting.startswith("LETTERS "))
+        pot = greeting.split()[1]
+        scores = letterpotpoints.pot_cache.get(pot)
+        word = scores.playable[0]
+
+        reply = await self.ask(reader, writer, word)
+        points = scores.wordpoints[word]
+        self.assertEqual(reply, f"VALID {points:g} {points:g} "
+                                f"{scores.possiblepoints:g}")
+        self.assertEqual(await self.ask(reader, writer, word), "DUPLICATE")
+        self.assertEqual(await self.ask(reader, writer, "qqqq"), "INVALID")
+
+        reply = await self.ask(reader, writer, "HELP length")
+        self.assertTrue(reply.startswith("HINT "), reply)
+        self.assertEqual(await self.ask(reader, writer, "HELP"), "NOHINT")
+        reply = await self.ask(reader, writer, "HELP nonsense")
+        self.assertTrue(reply.startswith("ERROR "), reply)
+
+        reply = await self.ask(reader, writer, f"PREFIX {word[:2]}")
+        self.assertTrue(reply.startswith("ALIVE "), reply)
+        self.assertEqual(await self.ask(reader, writer, "PREFIX qqq"), "DEAD")
+
+        for line in ("PREFIX", "NAME", "PREFIX  ", "NAME  "):
+            reply = await self.ask(reader, writer, line)
+            self.assertTrue(reply.startswith("ERROR "), reply)
+        self.assertEqual(await self.ask(reader, writer, "NAME bob"), "OK")
+
+        self.assertTrue((await self.ask(reader, writer, "DONE"))
+                        .startswith("MISSED "))
+        lines = []
+        while not lines or lines[-1] != "END":
+            lines.append(await self.reply(reader))
+        self.assertEqual(self.game_server.games_played, 1)
+
+    async def test_bad_commands_are_not_guesses(self):
+        game_server = await self.start()
+        session = letterpotpoints.GameSession("guest", "aceilms")
+        for line in ("PREFIX", "prefix ", "NAME", "HELP nonsense"):
+            self.assertTrue(game_server.respond(session, line)
+                            .startswith("ERROR "), line)
+        self.assertEqual(session.player.guessed_words, ())
+        self.assertEqual(session.player.name, "guest")
+        # a rejected HELP does not build the hint engine
+        self.assertIsNone(session._hints)
+
+    async def test_quit(self):
+        await self.start()
+        reader, writer = await self.connect()
+        await self.reply(reader)
+        self.assertEqual(await self.ask(reader, writer, "QUIT"), "BYE")
+        self.assertEqual(await reader.read(), b"")
+
+    async def test_timeout(self):
+        await self.start(idle_timeout=0.1)
+        reader, _ = await self.connect()
+        self.assertTrue((await self.reply(reader)).startswith("LETTERS "))
+        self.assertEqual(await self.reply(reader), "TIMEOUT")
+        self.assertEqual(await reader.read(), b"")
+
+    async def test_busy(self):
+        game_server = await self.start(max_sessions=1)
+        first, _ = await self.connect()
+        self.assertTrue((await self.reply(first)).startswith("LETTERS "))
+        second, _ = await self.connect()
+        self.assertEqual(await self.reply(second), "BUSY")
+        self.assertEqual(await second.read(), b"")
+        self.assertEqual(game_server.active, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
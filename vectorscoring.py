@@ -0,0 +1,135 @@
+"""
+Vectorized letterpot scoring for the Spelling Bee MadLibs game.
+
+Scores a whole letterpot with a few NumPy array operations instead of the
+per-letter loops in totalpoints() and inputpoints(). Each word becomes a row
+of a words x 26 matrix of letter counts, so:
+
+    letter counts    = column sums of the matrix
+    letter points    = the totalpoints() formula applied to every column
+    word scores      = matrix @ letter points
+    possible points  = letter counts @ letter points
+
+The results are the same values totalpoints() and inputpoints() give. NumPy
+is optional; without it the same functions fall back to plain Python.
+"""
+
+import letterpotpoints
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAVE_NUMPY = np is not None
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def letter_matrix(words):
+    """Build the words x 26 letter count matrix for a list of words.
+
+    Args:
+        words (list of str): lowercase a-z words.
+
+    Returns:
+        numpy.ndarray: int64 matrix, one row per word, one column per letter.
+    """
+    lengths = np.fromiter((len(word) for word in words), dtype=np.int64,
+                          count=len(words))
+    codes = np.frombuffer("".join(words).encode("ascii"), dtype=np.uint8)
+    rows = np.repeat(np.arange(len(words), dtype=np.int64), lengths)
+    cells = rows * 26 + (codes.astype(np.int64) - 97)
+    counts = np.bincount(cells, minlength=len(words) * 26)
+    return counts.reshape(len(words), 26)
+
+
+def letter_points(lettercounts):
+    """Apply the totalpoints() formula to an array of 26 letter counts.
+
+    Args:
+        lettercounts (numpy.ndarray): how often each letter a-z shows up.
+
+    Returns:
+        numpy.ndarray: float points per letter, 0 for letters not used.
+    """
+    present = lettercounts > 0
+    if not present.any():
+        raise ValueError("cannot score a letterpot with no letters")
+    proportion = lettercounts / lettercounts.sum()
+    minfreq = proportion[present].min()
+    maxfreq = proportion[present].max()
+    if maxfreq == minfreq:
+        return np.where(present, 10.0, 0.0)
+    score = (maxfreq - proportion) / (maxfreq - minfreq) #0-1 scale
+    return np.where(present, np.round(1 + score * 9, 0), 0.0) #10-1 scale
+
+
+def score_pot(words):
+    """Score a letterpot in one go.
+
+    Args:
+        words (list of str): all of the words that can be made from the pot.
+
+    Returns:
+        tuple: (letterpoints, lettercount, wordpoints, possiblepoints), where
+        letterpoints and lettercount match totalpoints(), wordpoints maps each
+        word to what inputpoints() would award, and possiblepoints is the
+        second value inputpoints() returns.
+    """
+    if np is None:
+        return _score_pot_python(words)
+    matrix = letter_matrix(words)
+    counts = matrix.sum(axis=0)
+    points = letter_points(counts)
+    wordscores = matrix @ points
+    possiblepoints = float(counts @ points)
+
+    # totalpoints() gives a whole number 10 when every letter is as common
+    used = counts[counts > 0]
+    equal = used.min() == used.max()
+    letterpoints = {}
+    lettercount = {}
+    for i in np.flatnonzero(counts).tolist():
+        letter = LETTERS[i]
+        lettercount[letter] = int(counts[i])
+        letterpoints[letter] = 10 if equal else float(points[i])
+    wordpoints = dict(zip(words, wordscores.tolist()))
+    return letterpoints, lettercount, wordpoints, possiblepoints
+
+
+def _score_pot_python(words):
+    """Plain Python version of score_pot() for when NumPy is missing."""
+    scores = letterpotpoints.PotScores(None, words)
+    return (scores.letterpoints, scores.lettercount, scores.wordpoints,
+            scores.possiblepoints)
+
+
+def score_pots(pots):
+    """Score many letterpots.
+
+    Args:
+        pots (dict): letterpot key -> list of words, like letterpots.
+
+    Returns:
+        dict: letterpot key -> the tuple score_pot() returns.
+    """
+    return {key: score_pot(words) for key, words in pots.items()}
+
+
+def word_scores(words, pot_words):
+    """Score a large batch of candidate words against one letterpot's point
+    table without building a dictionary per word.
+
+    Args:
+        words (list of str): the words to score.
+        pot_words (list of str): the pot's words, used for letter points.
+
+    Returns:
+        list of float: the score of each word, in order.
+    """
+    if np is None:
+        letterpoints = letterpotpoints.score_letters(pot_words)[0]
+        return [sum(letterpoints.get(letter, 0) for letter in word)
+                for word in words]
+    points = letter_points(letter_matrix(pot_words).sum(axis=0))
+    return (letter_matrix(words) @ points).tolist()